@@ -8,12 +8,16 @@ from alembic import context
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 # Now import your Base and models
+from app.core.config import settings
 from app.core.database import Base
-from app.models import user  # import ALL model files here so Alembic can detect them
+from app.models import user, token  # import ALL model files here so Alembic can detect them
 
 # This is the Alembic Config object
 config = context.config
 
+# Use the same database as the application (escape % for configparser)
+config.set_main_option("sqlalchemy.url", settings.DATABASE_URL.replace("%", "%%"))
+
 # Interpret the config file for Python logging
 if config.config_file_name is not None:
     fileConfig(config.config_file_name)
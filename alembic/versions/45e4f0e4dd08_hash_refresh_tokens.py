@@ -0,0 +1,50 @@
+"""Store refresh tokens as SHA-256 hashes
+
+Revision ID: 45e4f0e4dd08
+Revises: d7e949b0c66c
+Create Date: 2026-10-18 19:58:32.640915
+
+New tokens have the form "<id>.<secret>". They are looked up by primary key
+and only sha256(secret) is kept in the fixed-width token_hash column.
+Existing rows keep their raw value in `token` and keep working until
+they expire. Once REFRESH_TOKEN_EXPIRE_DAYS have passed, nothing reads
+that column any more and a follow-up migration can drop it.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '45e4f0e4dd08'
+down_revision: Union[str, Sequence[str], None] = 'd7e949b0c66c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Batch mode: plain ALTERs on PostgreSQL, a table copy on SQLite (which can't ALTER constraints).
+    # length() of a bytea/BLOB counts bytes on both
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.add_column(sa.Column('token_hash', sa.LargeBinary(length=32), nullable=True))
+        batch_op.create_check_constraint(
+            'ck_refresh_tokens_token_hash_len', 'token_hash IS NULL OR length(token_hash) = 32'
+        )
+        batch_op.create_check_constraint(
+            'ck_refresh_tokens_token_or_hash', 'token IS NOT NULL OR token_hash IS NOT NULL'
+        )
+        batch_op.alter_column('token', existing_type=sa.String(), nullable=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Hashed tokens cannot be turned back into raw ones; they are revoked
+    op.execute("DELETE FROM refresh_tokens WHERE token IS NULL")
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.alter_column('token', existing_type=sa.String(), nullable=False)
+        batch_op.drop_constraint('ck_refresh_tokens_token_or_hash', type_='check')
+        batch_op.drop_constraint('ck_refresh_tokens_token_hash_len', type_='check')
+        batch_op.drop_column('token_hash')
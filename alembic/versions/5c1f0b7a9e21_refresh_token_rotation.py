@@ -0,0 +1,32 @@
+"""Track the rotated-away refresh token hash for reuse detection
+
+Revision ID: 5c1f0b7a9e21
+Revises: 45e4f0e4dd08
+Create Date: 2026-10-18 21:04:11.318207
+
+With REFRESH_TOKEN_ROTATION each refresh replaces token_hash in place and
+keeps the old digest in previous_token_hash. A refresh presenting that old
+secret is a replay and revokes the row (the token family).
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c1f0b7a9e21'
+down_revision: Union[str, Sequence[str], None] = '45e4f0e4dd08'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('refresh_tokens', sa.Column('previous_token_hash', sa.LargeBinary(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('refresh_tokens', 'previous_token_hash')
@@ -0,0 +1,31 @@
+"""Add a version counter to users for ETags
+
+Revision ID: 8d2e6c4f1a37
+Revises: 5c1f0b7a9e21
+Create Date: 2026-10-18 22:17:40.512904
+
+Every UPDATE of a user increments version; GET /users/{id}, /users/me and
+list pages derive their ETags from it.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2e6c4f1a37'
+down_revision: Union[str, Sequence[str], None] = '5c1f0b7a9e21'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'version')
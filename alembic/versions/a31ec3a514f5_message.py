@@ -20,15 +20,19 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     """Upgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
+    # Autogenerated while the token model wasn't imported in env.py. No earlier revision creates
+    # refresh_tokens (create_all() did), so on a database built from migrations there is nothing to drop
+    if not sa.inspect(op.get_bind()).has_table('refresh_tokens'):
+        return
     op.drop_index(op.f('ix_refresh_tokens_id'), table_name='refresh_tokens')
     op.drop_table('refresh_tokens')
-    # ### end Alembic commands ###
 
 
 def downgrade() -> None:
     """Downgrade schema."""
-    # ### commands auto generated by Alembic - please adjust! ###
+    # Databases built from migrations never dropped it (see upgrade)
+    if sa.inspect(op.get_bind()).has_table('refresh_tokens'):
+        return
     op.create_table('refresh_tokens',
     sa.Column('id', sa.INTEGER(), autoincrement=True, nullable=False),
     sa.Column('user_id', sa.INTEGER(), autoincrement=False, nullable=False),
@@ -40,4 +44,3 @@ def downgrade() -> None:
     sa.UniqueConstraint('token', name=op.f('refresh_tokens_token_key'), postgresql_include=[], postgresql_nulls_not_distinct=False)
     )
     op.create_index(op.f('ix_refresh_tokens_id'), 'refresh_tokens', ['id'], unique=False)
-    # ### end Alembic commands ###
@@ -0,0 +1,57 @@
+"""Add trigram search indexes on users
+
+Revision ID: ab27cd984476
+Revises: 97ec88cc3845
+Create Date: 2026-10-18 19:20:41.512304
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ab27cd984476'
+down_revision: Union[str, Sequence[str], None] = '97ec88cc3845'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    # Creating the extension needs a role with CREATE privilege on the database
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_username_trgm "
+            "ON users USING gin (username gin_trgm_ops)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_email_trgm "
+            "ON users USING gin (email gin_trgm_ops)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_username_lower_prefix "
+            "ON users (lower(username) text_pattern_ops)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_email_lower_prefix "
+            "ON users (lower(email) text_pattern_ops)"
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if op.get_bind().dialect.name != "postgresql":
+        return
+
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_email_lower_prefix")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_username_lower_prefix")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_email_trgm")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_users_username_trgm")
@@ -0,0 +1,31 @@
+"""Add token_version to users for access-token revocation
+
+Revision ID: b4a9d3e7c215
+Revises: 8d2e6c4f1a37
+Create Date: 2026-10-18 23:02:55.184630
+
+Access tokens carry the token_version they were issued under; bumping it
+revokes all of them. Existing tokens have no claim and count as version 0.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4a9d3e7c215'
+down_revision: Union[str, Sequence[str], None] = '8d2e6c4f1a37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('users', 'token_version')
@@ -0,0 +1,65 @@
+"""Add lookup indexes on users.username and refresh_tokens
+
+Revision ID: d7e949b0c66c
+Revises: ab27cd984476
+Create Date: 2026-10-18 19:41:07.208113
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7e949b0c66c'
+down_revision: Union[str, Sequence[str], None] = 'ab27cd984476'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+
+    # a31ec3a514f5 dropped refresh_tokens and only create_all() brought it back,
+    # so databases built purely from migrations may not have it
+    if not sa.inspect(bind).has_table('refresh_tokens'):
+        op.create_table('refresh_tokens',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('token', sa.String(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('token')
+        )
+        op.create_index(op.f('ix_refresh_tokens_id'), 'refresh_tokens', ['id'], unique=False)
+
+    duplicates = bind.execute(sa.text(
+        "SELECT username FROM users GROUP BY username HAVING count(*) > 1 LIMIT 5"
+    )).scalars().all()
+    if duplicates:
+        raise RuntimeError(
+            f"Cannot add unique index on users.username, duplicated usernames exist (e.g. {duplicates}); "
+            "rename them and re-run the migration"
+        )
+
+    with op.get_context().autocommit_block():
+        op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=True,
+                        postgresql_concurrently=True)
+        op.create_index(op.f('ix_refresh_tokens_user_id'), 'refresh_tokens', ['user_id'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index(op.f('ix_refresh_tokens_expires_at'), 'refresh_tokens', ['expires_at'], unique=False,
+                        postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index(op.f('ix_refresh_tokens_expires_at'), table_name='refresh_tokens',
+                      postgresql_concurrently=True)
+        op.drop_index(op.f('ix_refresh_tokens_user_id'), table_name='refresh_tokens',
+                      postgresql_concurrently=True)
+        op.drop_index(op.f('ix_users_username'), table_name='users', postgresql_concurrently=True)
@@ -0,0 +1,48 @@
+"""Keep every rotated-away refresh token hash for reuse detection
+
+Revision ID: f3c81e0d4b62
+Revises: b4a9d3e7c215
+Create Date: 2026-10-19 10:12:37.604118
+
+previous_token_hash only remembered the last secret a token was rotated
+away from, so a stolen token refreshed twice by the thief no longer looked
+like a replay. retired_refresh_tokens keeps all of them until the token
+row (the family) is deleted.
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c81e0d4b62'
+down_revision: Union[str, Sequence[str], None] = 'b4a9d3e7c215'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'retired_refresh_tokens',
+        sa.Column('token_hash', sa.LargeBinary(length=32), nullable=False),
+        sa.Column('token_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['token_id'], ['refresh_tokens.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('token_hash'),
+    )
+    op.create_index(op.f('ix_retired_refresh_tokens_token_id'), 'retired_refresh_tokens', ['token_id'], unique=False)
+    op.execute(
+        "INSERT INTO retired_refresh_tokens (token_hash, token_id) "
+        "SELECT previous_token_hash, id FROM refresh_tokens WHERE previous_token_hash IS NOT NULL"
+    )
+    op.drop_column('refresh_tokens', 'previous_token_hash')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Which retired hash is the newest is not recorded: reuse detection starts over after a downgrade
+    op.add_column('refresh_tokens', sa.Column('previous_token_hash', sa.LargeBinary(length=32), nullable=True))
+    op.drop_index(op.f('ix_retired_refresh_tokens_token_id'), table_name='retired_refresh_tokens')
+    op.drop_table('retired_refresh_tokens')
@@ -0,0 +1,74 @@
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from app.core.metrics import LatencyHistogram
+
+
+class PoolTelemetry:
+    def __init__(self):
+        self.waiters = 0
+        self.timeouts = 0
+        self.checkout_wait = LatencyHistogram()
+        self._lock = threading.Lock()
+
+    def enter(self):
+        with self._lock:
+            self.waiters += 1
+
+    def leave(self, waited: float, timed_out: bool):
+        with self._lock:
+            self.waiters -= 1
+            if timed_out:
+                self.timeouts += 1
+        self.checkout_wait.observe(waited)
+
+
+class _InstrumentedPoolMixin:
+    """Tracks callers waiting for a connection and how long each checkout waited."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.telemetry = PoolTelemetry()
+
+    def _do_get(self):
+        self.telemetry.enter()
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            self.telemetry.leave(time.perf_counter() - start, timed_out)
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+def pool_stats(engine) -> dict:
+    pool = engine.pool
+    stats = {"pool_class": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            checked_out=pool.checkedout(),
+            overflow=max(pool.overflow(), 0),
+        )
+    telemetry = getattr(pool, "telemetry", None)
+    if telemetry is not None:
+        stats.update(
+            waiters=telemetry.waiters,
+            timeouts=telemetry.timeouts,
+            checkout_wait=telemetry.checkout_wait.snapshot(),
+        )
+    return stats
@@ -0,0 +1,159 @@
+"""
+Per-request SQL instrumentation.
+
+SQLAlchemy cursor events feed the stats of the request currently being
+served (tracked in a ContextVar by QueryStatsMiddleware): statement count,
+total DB time and the slowest statement. They are reported in a
+`Server-Timing` header, aggregated per route for /internal/metrics, and
+statements slower than SLOW_QUERY_THRESHOLD_MS are logged. The header is
+only sent with SERVER_TIMING_HEADER=true (e.g. in benchmarks): it tells any
+client how much DB work its request caused.
+"""
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.metrics import LatencyHistogram, render_counter, render_histogram
+
+logger = logging.getLogger(__name__)
+
+
+class RequestDbStats:
+    __slots__ = ("queries", "db_time", "slowest_time", "slowest_statement")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement: Optional[str] = None
+
+
+_current_stats: ContextVar[Optional[RequestDbStats]] = ContextVar("request_db_stats", default=None)
+
+
+def current_request_stats() -> Optional[RequestDbStats]:
+    return _current_stats.get()
+
+
+class RouteMetrics:
+    def __init__(self):
+        self.requests = 0
+        self.queries = 0
+        self.duration = LatencyHistogram()
+        self.db_time = LatencyHistogram()
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self.routes: dict[tuple[str, str], RouteMetrics] = {}
+        self.slow_queries = 0
+        self._lock = threading.Lock()
+
+    def record(self, method: str, route: str, duration: float, stats: RequestDbStats):
+        with self._lock:
+            metrics = self.routes.get((method, route))
+            if metrics is None:
+                metrics = self.routes[(method, route)] = RouteMetrics()
+            metrics.requests += 1
+            metrics.queries += stats.queries
+        metrics.duration.observe(duration)
+        metrics.db_time.observe(stats.db_time)
+
+    def render(self) -> str:
+        with self._lock:
+            items = sorted(self.routes.items())
+        labelled = [({"method": method, "route": route}, metrics) for (method, route), metrics in items]
+        lines = []
+        lines += render_counter("http_requests_total", [(l, m.requests) for l, m in labelled],
+                                "Requests served")
+        lines += render_counter("http_request_db_queries_total", [(l, m.queries) for l, m in labelled],
+                                "SQL statements executed while serving requests")
+        lines += render_histogram("http_request_duration_seconds", [(l, m.duration) for l, m in labelled],
+                                  "Request latency")
+        lines += render_histogram("http_request_db_seconds", [(l, m.db_time) for l, m in labelled],
+                                  "Time spent in SQL statements per request")
+        lines += render_counter("db_slow_queries_total", [({}, self.slow_queries)],
+                                f"Statements slower than {settings.SLOW_QUERY_THRESHOLD_MS}ms")
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start_time = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_query_start_time", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_time += elapsed
+        if elapsed > stats.slowest_time:
+            stats.slowest_time = elapsed
+            stats.slowest_statement = statement
+
+    if elapsed * 1000 >= settings.SLOW_QUERY_THRESHOLD_MS:
+        metrics_registry.slow_queries += 1
+        logger.warning("Slow query (%.1fms): %s", elapsed * 1000, " ".join(statement.split())[:1000])
+
+
+def instrument_engine(engine):
+    """Attach the timing listeners to a sync Engine (use async_engine.sync_engine for async ones)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """Pure ASGI middleware, so the ContextVar is shared with the endpoint and streaming bodies work."""
+
+    def __init__(self, app, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestDbStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and self.server_timing:
+                elapsed_ms = (time.perf_counter() - start) * 1000
+                value = (
+                    f'db;dur={stats.db_time * 1000:.2f};desc="{stats.queries} queries", '
+                    f"db-slowest;dur={stats.slowest_time * 1000:.2f}, "
+                    f"app;dur={elapsed_ms:.2f}"
+                )
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"server-timing", value.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_stats.reset(token)
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            metrics_registry.record(scope["method"], route_path, time.perf_counter() - start, stats)
+            if stats.slowest_statement is not None and logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    "%s %s: %d queries, %.1fms in DB, slowest %.1fms: %s",
+                    scope["method"], route_path, stats.queries, stats.db_time * 1000,
+                    stats.slowest_time * 1000, " ".join(stats.slowest_statement.split())[:500],
+                )
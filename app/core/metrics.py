@@ -0,0 +1,73 @@
+import threading
+from typing import Sequence
+
+
+# Upper bounds (seconds) of the latency buckets, the last bucket is +Inf
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class LatencyHistogram:
+    """Thread-safe cumulative latency histogram (count, sum, max, buckets)."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+            self._bucket_counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, seconds: float):
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                index = i
+                break
+        with self._lock:
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+            self._bucket_counts[index] += 1
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            cumulative = 0
+            buckets = {}
+            for bound, count in zip(self.buckets + (float("inf"),), self._bucket_counts):
+                cumulative += count
+                buckets["+Inf" if bound == float("inf") else str(bound)] = cumulative
+            return {
+                "count": self.count,
+                "sum_seconds": round(self.total, 6),
+                "avg_seconds": round(self.total / self.count, 6) if self.count else 0.0,
+                "max_seconds": round(self.max, 6),
+                "buckets": buckets,
+            }
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+def render_counter(name: str, samples: list[tuple[dict, float]], help_text: str) -> list[str]:
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+    lines += [f"{name}{_format_labels(labels)} {value}" for labels, value in samples]
+    return lines
+
+
+def render_histogram(name: str, samples: list[tuple[dict, "LatencyHistogram"]], help_text: str) -> list[str]:
+    """Prometheus text exposition of a set of labelled histograms."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, histogram in samples:
+        snapshot = histogram.snapshot()
+        for bound, count in snapshot["buckets"].items():
+            lines.append(f"{name}_bucket{_format_labels({**labels, 'le': bound})} {count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {snapshot['sum_seconds']}")
+        lines.append(f"{name}_count{_format_labels(labels)} {snapshot['count']}")
+    return lines
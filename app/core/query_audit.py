@@ -0,0 +1,78 @@
+"""
+EXPLAIN the hot-path CRUD queries and warn about sequential scans.
+
+Sequential scans are disabled for the duration of the check, so a
+`Seq Scan` that still shows up means no index can serve the query at all
+(on small tables the planner would otherwise legitimately pick one).
+
+Run it on its own with `python -m app.core.query_audit`, or at startup by
+setting DB_AUDIT_QUERY_PLANS=true.
+"""
+import json
+import logging
+import sys
+from datetime import datetime
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import joinedload
+
+from app.crud.token import refresh_token_condition
+from app.models.token import RefreshToken
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+
+def _hot_queries() -> dict:
+    return {
+        "get_user_by_name": select(User).where(User.username == "probe").limit(1),
+        "get_user_by_email": select(User).where(User.email == "probe@example.com").limit(1),
+        "get_user": select(User).where(User.id == 1),
+        # get_refresh_token: primary-key get() with the owner joined, the secret is checked in Python
+        "get_refresh_token": select(RefreshToken).options(joinedload(RefreshToken.user)).where(RefreshToken.id == 1),
+        # Built by the same helper as the rotate/logout statements, so the probes follow the crud code
+        "rotate_or_revoke_refresh_token": select(RefreshToken.id).where(refresh_token_condition("1.probe")),
+        "get_refresh_token_legacy_format": select(RefreshToken.id).where(refresh_token_condition("probe")),
+        "revoke_all_tokens_for_user": delete(RefreshToken).where(RefreshToken.user_id == 1),
+        "expired_refresh_tokens": select(RefreshToken.id).where(RefreshToken.expires_at < datetime.utcnow()),
+    }
+
+
+def _seq_scans(plan: dict) -> list[str]:
+    found = []
+    if plan.get("Node Type") == "Seq Scan":
+        found.append(plan.get("Relation Name", "?"))
+    for child in plan.get("Plans", []):
+        found.extend(_seq_scans(child))
+    return found
+
+
+def audit_query_plans(engine) -> list[str]:
+    """Return one warning per hot query whose plan contains a sequential scan."""
+    if engine.dialect.name != "postgresql":
+        logger.info("Query plan audit skipped: only supported on PostgreSQL")
+        return []
+
+    warnings = []
+    with engine.connect() as conn:
+        with conn.begin() as transaction:
+            conn.exec_driver_sql("SET LOCAL enable_seqscan = off")
+            for name, statement in _hot_queries().items():
+                compiled = statement.compile(dialect=engine.dialect)
+                rows = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params).scalar()
+                plan = (json.loads(rows) if isinstance(rows, str) else rows)[0]["Plan"]
+                for relation in _seq_scans(plan):
+                    warnings.append(f"{name}: sequential scan on {relation}, no usable index")
+            # EXPLAIN without ANALYZE never executes the DELETE, roll back anyway
+            transaction.rollback()
+
+    for warning in warnings:
+        logger.warning("Query plan audit: %s", warning)
+    return warnings
+
+
+if __name__ == "__main__":
+    from app.core.database import engine
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    sys.exit(1 if audit_query_plans(engine) else 0)
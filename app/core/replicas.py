@@ -0,0 +1,195 @@
+"""
+Read-replica routing.
+
+Read-only routes depend on `get_read_db` instead of `get_async_db`. It hands
+out a session on one of the DATABASE_REPLICA_URLS, picked round-robin or by
+fewest in-flight sessions (REPLICA_SELECTION). Replicas that fail the health
+check, or lag more than REPLICA_MAX_LAG_SECONDS behind, are skipped. When no
+replica qualifies, or the client wrote something within the last
+READ_YOUR_WRITES_SECONDS, the read goes to the primary instead.
+
+Read-your-writes is tracked with a cookie that ReadYourWritesMiddleware sets
+on every successful POST/PUT/PATCH/DELETE response, so it works across
+worker processes and nodes.
+"""
+import asyncio
+import itertools
+import logging
+import time
+from typing import Optional
+
+from fastapi import Request
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, engine_options, to_async_url
+
+logger = logging.getLogger(__name__)
+
+READ_YOUR_WRITES_COOKIE = "db_primary_until"
+
+# Seconds since the last replayed transaction, or 0 when everything received has been replayed
+# (an idle primary would otherwise look like growing lag)
+REPLICA_LAG_SQL = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() "
+    "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class Replica:
+    def __init__(self, name: str, engine: AsyncEngine):
+        self.name = name
+        self.engine = engine
+        self.sessionmaker = async_sessionmaker(bind=engine, class_=AsyncSession, autoflush=False,
+                                               expire_on_commit=False)
+        self.healthy = False
+        self.lag: Optional[float] = None
+        self.in_flight = 0
+        self.last_error: Optional[str] = None
+
+    async def _measure_lag(self) -> float:
+        async with self.engine.connect() as conn:
+            if self.engine.dialect.name != "postgresql":
+                await conn.execute(text("SELECT 1"))
+                return 0.0
+            return float(await conn.scalar(REPLICA_LAG_SQL))
+
+    async def check(self, timeout: float):
+        try:
+            self.lag = await asyncio.wait_for(self._measure_lag(), timeout)
+            self.healthy, self.last_error = True, None
+        except Exception as exc:
+            if self.healthy:
+                logger.warning("Replica %s failed its health check: %r", self.name, exc)
+            self.healthy, self.last_error = False, repr(exc)
+
+    def stats(self) -> dict:
+        return {"healthy": self.healthy, "lag_seconds": self.lag, "in_flight": self.in_flight,
+                "last_error": self.last_error}
+
+
+class ReplicaRouter:
+    def __init__(self, urls: list[str], selection: str, max_lag: float, check_interval: float):
+        self.selection = selection
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.replicas = []
+        for index, url in enumerate(urls):
+            async_url = to_async_url(url)
+            self.replicas.append(Replica(f"replica-{index}", create_async_engine(
+                async_url, **engine_options(async_url, is_async=True)
+            )))
+        self._round_robin = itertools.count()
+        self._task: Optional[asyncio.Task] = None
+        self.reads = {"replica": 0, "primary_fallback": 0, "primary_read_your_writes": 0}
+
+    def _usable(self) -> list[Replica]:
+        return [r for r in self.replicas if r.healthy and r.lag is not None and r.lag <= self.max_lag]
+
+    def pick(self) -> Optional[Replica]:
+        candidates = self._usable()
+        if not candidates:
+            return None
+        if self.selection == "least_connections":
+            return min(candidates, key=lambda r: r.in_flight)
+        return candidates[next(self._round_robin) % len(candidates)]
+
+    async def check_all(self):
+        await asyncio.gather(*(replica.check(timeout=self.check_interval) for replica in self.replicas))
+
+    async def _loop(self):
+        while True:
+            await self.check_all()
+            await asyncio.sleep(self.check_interval)
+
+    async def start(self):
+        if self.replicas and self._task is None:
+            await self.check_all()  # don't start with every replica marked unhealthy
+            self._task = asyncio.create_task(self._loop(), name="replica-health-check")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+    def stats(self) -> dict:
+        return {
+            "selection": self.selection,
+            "max_lag_seconds": self.max_lag,
+            "reads": dict(self.reads),
+            "replicas": {replica.name: replica.stats() for replica in self.replicas},
+        }
+
+
+replica_router = ReplicaRouter(
+    urls=[url.strip() for url in settings.DATABASE_REPLICA_URLS.split(",") if url.strip()],
+    selection=settings.REPLICA_SELECTION,
+    max_lag=settings.REPLICA_MAX_LAG_SECONDS,
+    check_interval=settings.REPLICA_HEALTH_CHECK_INTERVAL,
+)
+
+
+def _wrote_recently(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+# Read-only dependency
+async def get_read_db(request: Request):
+    if not replica_router.replicas:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    replica = None
+    if _wrote_recently(request):
+        replica_router.reads["primary_read_your_writes"] += 1
+    else:
+        replica = replica_router.pick()
+        replica_router.reads["replica" if replica else "primary_fallback"] += 1
+
+    if replica is None:
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
+
+    replica.in_flight += 1
+    try:
+        async with replica.sessionmaker() as db:
+            yield db
+    finally:
+        replica.in_flight -= 1
+
+
+class ReadYourWritesMiddleware:
+    """Marks clients that just wrote, so get_read_db sends their reads to the primary for a while."""
+
+    UNSAFE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+    def __init__(self, app, window: float):
+        self.app = app
+        self.window = window
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in self.UNSAFE_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_cookie(message):
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = (f"{READ_YOUR_WRITES_COOKIE}={time.time() + self.window:.0f}; "
+                          f"Max-Age={int(self.window)}; Path=/; HttpOnly; SameSite=Lax")
+                message["headers"] = list(message.get("headers", [])) + [(b"set-cookie", cookie.encode())]
+            await send(message)
+
+        await self.app(scope, receive, send_with_cookie)
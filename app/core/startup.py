@@ -0,0 +1,97 @@
+"""
+Startup warm-up and readiness state.
+
+The app starts serving immediately (liveness), while warm-up runs in the
+background: open the pool connections, spin up the password hashing
+workers and load the JWT keys. /health/ready only reports ready once all
+of it succeeded, so a briefly unreachable database delays readiness
+instead of crashing the worker.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import text
+from starlette.concurrency import run_in_threadpool
+
+from app.core import database
+from app.core.config import settings
+from app.core.query_audit import audit_query_plans
+from app.utils.password_hasher import password_hasher
+from app.utils.security import prime_jwt_keys
+
+logger = logging.getLogger(__name__)
+
+
+class Readiness:
+    def __init__(self):
+        self.ready = False
+        self.checks: dict[str, str] = {"database": "pending", "password_hasher": "pending", "jwt": "pending"}
+        self.started_at = time.time()
+        self.ready_at: Optional[float] = None
+
+    def mark(self, check: str, state: str):
+        self.checks[check] = state
+        if all(value == "ok" for value in self.checks.values()):
+            self.ready = True
+            self.ready_at = time.time()
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "checks": self.checks,
+            "warm_up_seconds": round(self.ready_at - self.started_at, 3) if self.ready_at else None,
+        }
+
+
+readiness = Readiness()
+
+
+async def _warm_up_database():
+    """Open DB_POOL_SIZE connections concurrently so the first requests don't pay for connects."""
+    async def ping():
+        async with database.async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    connections = 1 if settings.DB_PGBOUNCER_MODE else max(settings.DB_POOL_SIZE, 1)
+    deadline = time.monotonic() + settings.DB_WARM_UP_TIMEOUT if settings.DB_WARM_UP_TIMEOUT else None
+    delay = 0.5
+    while True:
+        try:
+            await asyncio.gather(*(ping() for _ in range(connections)))
+            break
+        except Exception as exc:
+            if deadline is not None and time.monotonic() > deadline:
+                raise
+            readiness.mark("database", f"retrying: {exc.__class__.__name__}")
+            logger.warning("Database not reachable yet (%s), retrying in %.1fs", exc, delay)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 10)
+
+    if settings.DB_CREATE_ALL_ON_STARTUP:
+        from app.models import token, user  # noqa: F401  (register every table on Base)
+
+        async with database.async_engine.begin() as conn:
+            await conn.run_sync(database.Base.metadata.create_all)
+
+    if settings.DB_AUDIT_QUERY_PLANS:
+        await run_in_threadpool(audit_query_plans, database.engine)
+
+
+async def warm_up():
+    async def step(name: str, coro):
+        try:
+            await coro
+            readiness.mark(name, "ok")
+        except Exception as exc:
+            readiness.mark(name, f"failed: {exc.__class__.__name__}")
+            logger.exception("Warm-up step %s failed", name)
+
+    await asyncio.gather(
+        step("database", _warm_up_database()),
+        step("password_hasher", password_hasher.warm_up()),
+        step("jwt", run_in_threadpool(prime_jwt_keys)),
+    )
+    if readiness.ready:
+        logger.info("Warm-up finished, ready to serve")
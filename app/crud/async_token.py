@@ -0,0 +1,182 @@
+import secrets
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import delete, exists, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+from app.crud.token import (
+    format_refresh_token, hash_refresh_secret, parse_refresh_token, refresh_secret_matches, refresh_token_condition
+)
+from app.models.token import RefreshToken, RetiredRefreshToken
+from app.models.user import User
+from app.utils.token_versions import publish as publish_token_version
+
+
+# Async counterparts of app.crud.token, used by the routers
+
+
+async def delete_tokens_for_user(db: AsyncSession, user_id: int):
+    # No commit: callers fold this into their own transaction
+    await db.execute(
+        delete(RefreshToken)
+        .where(RefreshToken.user_id == user_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def revoke_all_tokens_for_user(db: AsyncSession, user_id: int) -> Optional[int]:
+    """End every session: refresh tokens are deleted, access tokens revoked by a token version bump."""
+    token_version = await db.scalar(
+        update(User)
+        .where(User.id == user_id)
+        .values(token_version=User.token_version + 1)
+        .returning(User.token_version)
+        .execution_options(synchronize_session=False)
+    )
+    await delete_tokens_for_user(db, user_id)
+    if token_version is not None:
+        await publish_token_version(db, user_id, token_version)
+    await db.commit()
+    return token_version
+
+
+async def issue_refresh_token(db: AsyncSession, user_id: int, expires_at: datetime, max_active: int = 0) -> str:
+    secret = secrets.token_urlsafe(32)
+    db_token = RefreshToken(user_id=user_id, token_hash=hash_refresh_secret(secret), expires_at=expires_at)
+    db.add(db_token)
+    if max_active > 0:
+        await db.flush()
+        await _revoke_tokens_beyond(db, user_id, max_active)
+    await db.commit()
+    return format_refresh_token(db_token.id, secret)
+
+
+async def _revoke_tokens_beyond(db: AsyncSession, user_id: int, keep: int):
+    # Newest `keep` tokens survive, everything older goes
+    stale_ids = (
+        select(RefreshToken.id)
+        .where(RefreshToken.user_id == user_id)
+        .order_by(RefreshToken.id.desc())
+        .offset(keep)
+    )
+    await db.execute(
+        delete(RefreshToken)
+        .where(RefreshToken.id.in_(stale_ids.scalar_subquery()))
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def delete_expired_tokens_batch(db: AsyncSession, batch_size: int, now: Optional[datetime] = None) -> int:
+    """Delete up to `batch_size` expired tokens in one short transaction; returns rows deleted."""
+    expired_ids = (
+        select(RefreshToken.id)
+        .where(RefreshToken.expires_at < (now or datetime.utcnow()))
+        .limit(batch_size)
+    )
+    if db.bind.dialect.name == "postgresql":
+        # Don't queue behind rows a concurrent refresh/logout is working on
+        expired_ids = expired_ids.with_for_update(skip_locked=True)
+
+    result = await db.execute(
+        delete(RefreshToken)
+        .where(RefreshToken.id.in_(expired_ids.scalar_subquery()))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return result.rowcount
+
+
+async def get_refresh_token(db: AsyncSession, token: str) -> Optional[RefreshToken]:
+    # Eager-load the owner: lazy loading is not available on AsyncSession
+    parsed = parse_refresh_token(token)
+    if parsed is None:
+        return await db.scalar(
+            select(RefreshToken).options(joinedload(RefreshToken.user)).where(RefreshToken.token == token)
+        )
+
+    token_id, secret = parsed
+    db_token = await db.get(RefreshToken, token_id, options=[joinedload(RefreshToken.user)])
+    if db_token is None or not refresh_secret_matches(db_token, secret):
+        return None
+    return db_token
+
+
+async def delete_refresh_token(db: AsyncSession, db_token: RefreshToken):
+    await db.execute(delete(RefreshToken).where(RefreshToken.id == db_token.id))
+    await db.commit()
+
+
+async def revoke_refresh_token(db: AsyncSession, token: str) -> bool:
+    """Logout: a single DELETE ... RETURNING matched on id + digest (or the legacy raw value)."""
+    deleted = await db.scalar(
+        delete(RefreshToken).where(refresh_token_condition(token)).returning(RefreshToken.id).execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return deleted is not None
+
+
+async def rotate_refresh_token(db: AsyncSession, token: str, expires_at: datetime):
+    """
+    Swap the token's secret for a new one in a single UPDATE ... RETURNING.
+    The row keeps its id (the token family), the old digest is added to
+    retired_refresh_tokens, and the owner's id/username/role/token_version come back with it.
+    Returns (new token, row) or None when the token is unknown or expired.
+    """
+    new_secret = secrets.token_urlsafe(32)
+    parsed = parse_refresh_token(token)
+    condition = refresh_token_condition(token)  # a legacy raw token gets converted to the hashed format
+
+    # Scalar subqueries rather than UPDATE ... FROM users: SQLite can't RETURN columns of a FROM table
+    owner = RefreshToken.user_id == User.id
+    row = (await db.execute(
+        update(RefreshToken)
+        .where(condition, RefreshToken.expires_at > datetime.utcnow())
+        .values(
+            token_hash=hash_refresh_secret(new_secret),
+            token=None,
+            expires_at=expires_at,
+        )
+        .returning(
+            RefreshToken.id,
+            RefreshToken.user_id,
+            select(User.username).where(owner).scalar_subquery().label("username"),
+            select(User.role).where(owner).scalar_subquery().label("role"),
+            select(User.token_version).where(owner).scalar_subquery().label("token_version"),
+        )
+        .execution_options(synchronize_session=False)
+    )).first()
+    if row is None:
+        await db.commit()
+        return None
+    if parsed is not None:
+        # Same transaction: the new secret is only handed out once the old one is on record
+        db.add(RetiredRefreshToken(token_hash=hash_refresh_secret(parsed[1]), token_id=row.id))
+    await db.commit()
+    return format_refresh_token(row.id, new_secret), row
+
+
+async def reject_refresh_token(db: AsyncSession, token: str) -> str:
+    """
+    Classify a token that failed to rotate, deleting its row when needed:
+    "expired" (current secret, past expiry), "reused" (any secret the token
+    was rotated away from, however many rotations ago: the whole family is
+    revoked) or "invalid". A made-up secret for a known id is "invalid" and
+    deletes nothing, so guessing ids can't end other users' sessions.
+    """
+    parsed = parse_refresh_token(token)
+    if parsed is None:
+        return "invalid"
+    token_id, secret = parsed
+    digest = hash_refresh_secret(secret)
+    retired = exists().where(RetiredRefreshToken.token_hash == digest, RetiredRefreshToken.token_id == token_id)
+    is_current = await db.scalar(
+        delete(RefreshToken)
+        .where(RefreshToken.id == token_id, or_(RefreshToken.token_hash == digest, retired))
+        .returning(RefreshToken.token_hash == digest)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    if is_current is None:
+        return "invalid"
+    return "expired" if is_current else "reused"
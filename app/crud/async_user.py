@@ -0,0 +1,182 @@
+from typing import Optional
+
+from sqlalchemy import delete, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud.async_token import delete_tokens_for_user
+from app.models.user import User
+from app.schemas.user import UserCreate, UserUpdate
+from app.utils.password_hasher import password_hasher
+from app.utils.token_versions import publish as publish_token_version
+
+
+# Async counterparts of app.crud.user, used by the routers.
+# Every write is a single transaction built from INSERT ... ON CONFLICT,
+# UPDATE ... RETURNING and DELETE ... RETURNING, so no row is read back.
+
+
+# The UserResponse fields: listings and exports that select only these skip the ORM entirely
+USER_RESPONSE_COLUMNS = (User.id, User.username, User.email, User.role)
+
+
+def _insert(db: AsyncSession):
+    return sqlite_insert if db.get_bind().dialect.name == "sqlite" else pg_insert
+
+
+async def create_user(db: AsyncSession, user: UserCreate, hashed_password: Optional[str] = None) -> Optional[User]:
+    """Insert the user; returns None when the username or email is already taken."""
+    hashed_pw = hashed_password or await password_hasher.hash(user.password)
+    new_user = await db.scalar(
+        _insert(db)(User)
+        .values(
+            username=user.username,
+            email=user.email,
+            password_hash=hashed_pw,
+            role=user.role or "user"
+        )
+        .on_conflict_do_nothing()
+        .returning(User)
+    )
+    await db.commit()
+    return new_user
+
+
+async def find_taken(db: AsyncSession, usernames: list[str], emails: list[str]) -> tuple[set[str], set[str]]:
+    """Which of these usernames and emails already exist (one query)."""
+    rows = await db.execute(
+        select(User.username, User.email).where(or_(User.username.in_(usernames), User.email.in_(emails)))
+    )
+    taken_usernames, taken_emails = set(), set()
+    for username, email in rows:
+        taken_usernames.add(username)
+        taken_emails.add(email)
+    return taken_usernames, taken_emails
+
+
+async def insert_users_batch(db: AsyncSession, rows: list[dict]) -> dict[str, int]:
+    """
+    Multi-row INSERT ... ON CONFLICT DO NOTHING in one transaction.
+    Returns username -> id for the rows that were actually inserted.
+    """
+    if not rows:
+        return {}
+    result = await db.execute(
+        _insert(db)(User).values(rows).on_conflict_do_nothing().returning(User.id, User.username)
+    )
+    created = {username: user_id for user_id, username in result}
+    await db.commit()
+    return created
+
+
+async def get_user_by_name(db: AsyncSession, username: str):
+    return await db.scalar(select(User).where(User.username == username).limit(1))
+
+
+async def authenticate_user(db: AsyncSession, username: str, password: str):
+    user = await get_user_by_name(db, username)
+    if not user:
+        return False
+    # Hand the connection back to the pool while bcrypt runs (close() keeps `user` loaded)
+    await db.close()
+    if not await password_hasher.verify(password, user.password_hash):
+        return False
+    return user
+
+
+async def get_users(db: AsyncSession):
+    result = await db.scalars(select(User))
+    return result.all()
+
+
+async def get_user(db: AsyncSession, user_id: int):
+    return await db.get(User, user_id)
+
+
+async def get_user_version(db: AsyncSession, user_id: int) -> Optional[int]:
+    """Primary-key lookup of the version column only, for If-None-Match checks."""
+    return await db.scalar(select(User.version).where(User.id == user_id))
+
+
+async def get_user_by_email(db: AsyncSession, email: str):
+    return await db.scalar(select(User).where(User.email == email).limit(1))
+
+
+async def update_user_by_id(db: AsyncSession, user_id: int, user_data: UserUpdate):
+    update_data = user_data.dict(exclude_unset=True)
+    if not update_data:
+        return await get_user(db, user_id)
+
+    if "password" in update_data:
+        update_data["password_hash"] = await password_hasher.hash(update_data.pop("password"))
+        # A new password ends the existing sessions
+        update_data["token_version"] = User.token_version + 1
+
+    user = await db.scalar(
+        update(User)
+        .where(User.id == user_id)
+        .values(**update_data, version=User.version + 1)
+        .returning(User)
+        .execution_options(synchronize_session=False)
+    )
+    if user is not None:
+        # Without a bump this only makes every worker drop its cached snapshot (role, email, version)
+        await publish_token_version(db, user.id, user.token_version)
+    await db.commit()
+    return user
+
+
+async def change_password(db: AsyncSession, user_id: int, old_hash: str, new_hash: str) -> Optional[int]:
+    """
+    Swap the hash, bump the token version and revoke every refresh token in one transaction.
+    Returns the new token version, or None when the old hash no longer matches:
+    a concurrent password change loses instead of being overwritten.
+    """
+    token_version = await db.scalar(
+        update(User)
+        .where(User.id == user_id, User.password_hash == old_hash)
+        .values(password_hash=new_hash, version=User.version + 1, token_version=User.token_version + 1)
+        .returning(User.token_version)
+        .execution_options(synchronize_session=False)
+    )
+    if token_version is None:
+        await db.rollback()
+        return None
+
+    await delete_tokens_for_user(db, user_id)
+    await publish_token_version(db, user_id, token_version)
+    await db.commit()
+    return token_version
+
+
+async def upgrade_password_hash(db: AsyncSession, user_id: int, old_hash: str, new_hash: str) -> bool:
+    """Replace an outdated hash with one for the same password; a no-op if the password changed meanwhile."""
+    upgraded = await db.scalar(
+        update(User)
+        .where(User.id == user_id, User.password_hash == old_hash)
+        .values(password_hash=new_hash)
+        .returning(User.id)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+    return upgraded is not None
+
+
+async def delete_user_by_id(db: AsyncSession, user_id: int) -> Optional[int]:
+    """
+    Delete the user and their refresh tokens in one transaction.
+    Returns the token version that revokes their access tokens, or None if there was no such user.
+    """
+    await delete_tokens_for_user(db, user_id)
+    last_version = await db.scalar(
+        delete(User)
+        .where(User.id == user_id)
+        .returning(User.token_version)
+        .execution_options(synchronize_session=False)
+    )
+    if last_version is None:
+        await db.rollback()
+        return None
+    await publish_token_version(db, user_id, last_version + 1)
+    await db.commit()
+    return last_version + 1
@@ -0,0 +1,48 @@
+from sqlalchemy import func, or_
+
+from app.models.user import User
+
+
+SEARCH_MODES = ("contains", "prefix", "fuzzy")
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _search_columns(include_email: bool):
+    return [User.username, User.email] if include_email else [User.username]
+
+
+def user_search_filter(search: str, mode: str, include_email: bool, dialect: str):
+    """
+    WHERE clause for the user search.
+
+    On PostgreSQL each mode maps onto an operator served by an index from
+    migration ab27cd984476: ILIKE '%q%' and `%` (similarity) use the pg_trgm
+    GIN indexes, prefix search uses the lower(col) text_pattern_ops b-tree.
+    SQLite has no trigrams, so fuzzy falls back to a substring match there.
+    """
+    pattern = _escape_like(search.lower())
+    clauses = []
+    for column in _search_columns(include_email):
+        if mode == "prefix":
+            clauses.append(func.lower(column).like(f"{pattern}%", escape="\\"))
+        elif mode == "fuzzy" and dialect == "postgresql":
+            clauses.append(column.op("%")(search))
+        else:
+            clauses.append(column.ilike(f"%{pattern}%", escape="\\"))
+    return or_(*clauses)
+
+
+def user_search_ranking(search: str, include_email: bool, dialect: str) -> list:
+    """ORDER BY clauses putting the best matches first."""
+    columns = _search_columns(include_email)
+    if dialect == "postgresql":
+        scores = [func.similarity(column, search) for column in columns]
+        score = scores[0] if len(scores) == 1 else func.greatest(*scores)
+        return [score.desc()]
+
+    # Fallback: username matches first, earliest match position, then shortest username
+    position = func.instr(func.lower(User.username), search.lower())
+    return [(position == 0).asc(), position.asc(), func.length(User.username).asc()]
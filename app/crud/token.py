@@ -1,7 +1,90 @@
+import hashlib
+import hmac
+import re
+import secrets
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import update
 from sqlalchemy.orm import Session
 from app.models.token import RefreshToken
+from app.models.user import User
+from app.utils.token_versions import notify_statement
+
+
+TOKEN_ID_PATTERN = re.compile(r"[0-9]{1,10}")
+MAX_TOKEN_ID = 2**31 - 1  # refresh_tokens.id is an INTEGER
+
+
+def hash_refresh_secret(secret: str) -> bytes:
+    return hashlib.sha256(secret.encode()).digest()
+
+
+def format_refresh_token(token_id: int, secret: str) -> str:
+    return f"{token_id}.{secret}"
+
+
+def parse_refresh_token(token: str) -> Optional[tuple[int, str]]:
+    """
+    Split "<id>.<secret>"; None for legacy raw tokens (token_urlsafe never contains '.')
+    and for ids that can't be a refresh_tokens primary key (non-ASCII digits, beyond INTEGER).
+    """
+    token_id, sep, secret = token.partition(".")
+    if not sep or not secret or not TOKEN_ID_PATTERN.fullmatch(token_id):
+        return None
+    token_id = int(token_id)
+    if token_id > MAX_TOKEN_ID:
+        return None
+    return token_id, secret
 
 
-def revoke_all_tokens_for_user(db: Session, user_id: int):
+def refresh_secret_matches(db_token: RefreshToken, secret: str) -> bool:
+    return db_token.token_hash is not None and hmac.compare_digest(db_token.token_hash, hash_refresh_secret(secret))
+
+
+def refresh_token_condition(token: str):
+    """WHERE clause for a presented token: id + digest, or the raw value of a legacy token."""
+    parsed = parse_refresh_token(token)
+    if parsed is None:
+        return RefreshToken.token == token
+    token_id, secret = parsed
+    # Equality on a SHA-256 digest leaks nothing useful through timing
+    return (RefreshToken.id == token_id) & (RefreshToken.token_hash == hash_refresh_secret(secret))
+
+
+def revoke_all_tokens_for_user(db: Session, user_id: int) -> Optional[int]:
+    # Refresh tokens go, access tokens are revoked by bumping the token version
+    token_version = db.scalar(
+        update(User)
+        .where(User.id == user_id)
+        .values(token_version=User.token_version + 1)
+        .returning(User.token_version)
+        .execution_options(synchronize_session=False)
+    )
     db.query(RefreshToken).filter(RefreshToken.user_id == user_id).delete()
-    db.commit()
\ No newline at end of file
+    if token_version is not None and db.get_bind().dialect.name == "postgresql":
+        db.execute(notify_statement(user_id, token_version))
+    db.commit()
+    return token_version
+
+
+def issue_refresh_token(db: Session, user_id: int, expires_at: datetime) -> str:
+    secret = secrets.token_urlsafe(32)
+    db_token = RefreshToken(user_id=user_id, token_hash=hash_refresh_secret(secret), expires_at=expires_at)
+    db.add(db_token)
+    db.flush()
+    token_id = db_token.id
+    db.commit()
+    return format_refresh_token(token_id, secret)
+
+
+def get_refresh_token(db: Session, token: str) -> Optional[RefreshToken]:
+    parsed = parse_refresh_token(token)
+    if parsed is None:
+        return db.query(RefreshToken).filter(RefreshToken.token == token).first()
+
+    token_id, secret = parsed
+    db_token = db.get(RefreshToken, token_id)
+    if db_token is None or not refresh_secret_matches(db_token, secret):
+        return None
+    return db_token
@@ -1,11 +1,17 @@
+from typing import Optional
+
+from sqlalchemy import delete, select, update
 from sqlalchemy.orm import Session
+from app.models.token import RefreshToken
 from app.models.user import User
-from app.schemas.user import UserCreate, UserUpdate
+from app.schemas.user import UserCreate
 from app.utils.security import hash_password, verify_password
+from app.utils.token_versions import notify_statement
 
 
-def create_user(db: Session, user: UserCreate):
-    hashed_pw = hash_password(user.password)
+def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None):
+    # Async callers hash via the password_hasher pool and pass the result in
+    hashed_pw = hashed_password or hash_password(user.password)
     new_user = User(
         username=user.username,  # ✅ switched from name to username
         email=user.email,
@@ -43,29 +49,38 @@ def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
 
-def update_user_by_id(db: Session, user_id: int, user_data):
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        return None
-
+def update_user_by_id(db: Session, user_id: int, user_data, password_hash: Optional[str] = None):
     update_data = user_data.dict(exclude_unset=True)
+    if not update_data:
+        return get_user(db, user_id)
 
     # ✅ Hash the password if provided
     if "password" in update_data:
-        update_data["password_hash"] = hash_password(update_data.pop("password"))
-
-    for key, value in update_data.items():
-        setattr(user, key, value)
-
+        password = update_data.pop("password")
+        update_data["password_hash"] = password_hash or hash_password(password)
+        update_data["token_version"] = User.token_version + 1
+
+    # UPDATE ... RETURNING: no SELECT before, no refresh() after
+    user = db.scalar(
+        update(User)
+        .where(User.id == user_id)
+        .values(**update_data, version=User.version + 1)
+        .returning(User)
+        .execution_options(synchronize_session=False)
+    )
+    # Sent on every update: other workers drop their cached snapshot even when no tokens are revoked
+    if user is not None and db.get_bind().dialect.name == "postgresql":
+        db.execute(notify_statement(user.id, user.token_version))
     db.commit()
-    db.refresh(user)
     return user
 
 
 def delete_user_by_id(db: Session, user_id: int) -> bool:
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    # Tokens and user go in one transaction, without loading either
+    db.query(RefreshToken).filter(RefreshToken.user_id == user_id).delete(synchronize_session=False)
+    deleted = db.scalar(delete(User).where(User.id == user_id).returning(User.id))
+    if deleted is None:
+        db.rollback()
         return False
-    db.delete(user)
     db.commit()
     return True
\ No newline at end of file
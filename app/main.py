@@ -1,14 +1,66 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from starlette.concurrency import run_in_threadpool
 from app.core import database
-from app.models import user
+from app.core.config import settings
+from app.core.instrumentation import QueryStatsMiddleware, instrument_engine
+from app.core.replicas import ReadYourWritesMiddleware, replica_router
+from app.core.startup import warm_up
 from app.routers import user as user_router
 from app.routers import auth as auth_router
+from app.routers import health as health_router
+from app.routers import internal as internal_router
+from app.utils.password_hasher import password_hasher
+from app.utils.rate_limit import login_limiter
+from app.utils.token_reaper import token_reaper
+from app.utils.token_versions import token_version_listener
+
+
+# No DDL here: the schema is managed with Alembic (`alembic upgrade head`)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    password_hasher.start()
+
+    async def warm_up_then_start_reaper():
+        # The reaper's DELETEs need the schema, which warm-up may still be creating (create_all)
+        await warm_up()
+        if settings.TOKEN_REAPER_ENABLED:
+            token_reaper.start()
+
+    warm_up_task = asyncio.create_task(warm_up_then_start_reaper(), name="warm-up")
+    await replica_router.start()
+    if token_version_listener is not None:
+        token_version_listener.start()
+    yield
+    if token_version_listener is not None:
+        await token_version_listener.stop()
+    await replica_router.stop()
+    warm_up_task.cancel()
+    try:
+        await warm_up_task
+    except asyncio.CancelledError:
+        pass
+    await token_reaper.stop()
+    # Joins the hashing processes: not on the event loop thread
+    await run_in_threadpool(password_hasher.shutdown)
+    await login_limiter.close()
+    await database.async_engine.dispose()
+    await run_in_threadpool(database.engine.dispose)
+
 
+app = FastAPI(title="FastAPI + PostgreSQL App", lifespan=lifespan)
 
-# Create tables
-database.Base.metadata.create_all(bind=database.engine)
+if settings.SQL_INSTRUMENTATION_ENABLED:
+    instrument_engine(database.engine)
+    instrument_engine(database.async_engine.sync_engine)
+    for replica in replica_router.replicas:
+        instrument_engine(replica.engine.sync_engine)
+    app.add_middleware(QueryStatsMiddleware, server_timing=settings.SERVER_TIMING_HEADER)
 
-app = FastAPI(title="FastAPI + PostgreSQL App")
+if replica_router.replicas:
+    app.add_middleware(ReadYourWritesMiddleware, window=settings.READ_YOUR_WRITES_SECONDS)
 
 # ✅ Root (home) endpoint
 @app.get("/")
@@ -16,5 +68,8 @@ def read_root():
     return {"message": "🚀 FastAPI is running! Try /docs to see the API"}
 
 # Include routers
+app.include_router(health_router.router)
 app.include_router(auth_router.router)
-app.include_router(user_router.router)
\ No newline at end of file
+app.include_router(user_router.router)
+if settings.INTERNAL_ENDPOINTS_ENABLED:
+    app.include_router(internal_router.router)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime, timedelta
 from app.core.database import Base
@@ -7,9 +7,20 @@ class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    token = Column(String, nullable=False, unique=True)
-    expires_at = Column(DateTime, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    # Tokens are handed out as "<id>.<secret>"; only the SHA-256 of the secret is stored
+    token_hash = Column(LargeBinary(32), nullable=True)
+    # Raw tokens issued before the hashed format; kept until they expire
+    token = Column(String, nullable=True, unique=True)
+    expires_at = Column(DateTime, nullable=False, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    user = relationship("User", back_populates="refresh_tokens")
\ No newline at end of file
+    user = relationship("User", back_populates="refresh_tokens")
+
+
+class RetiredRefreshToken(Base):
+    # With rotation, every secret a token (family) was rotated away from: seeing one again means it leaked
+    __tablename__ = "retired_refresh_tokens"
+
+    token_hash = Column(LargeBinary(32), primary_key=True)
+    token_id = Column(Integer, ForeignKey("refresh_tokens.id", ondelete="CASCADE"), nullable=False, index=True)
\ No newline at end of file
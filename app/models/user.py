@@ -9,10 +9,14 @@ class User(Base):
     __tablename__ = "users"  # Table name in PostgreSQL
 
     id = Column(Integer, primary_key=True, index=True)
-    username  = Column(String, nullable=False)
+    username  = Column(String, unique=True, index=True, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
     password_hash = Column(String, nullable=False)
     role = Column(String, default="user")
+    # Incremented by every UPDATE of the row; drives the ETags in app.utils.etag
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+    # Bumped to revoke every access token issued before (the `tv` claim); see app.utils.token_versions
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
     refresh_tokens = relationship(
         "RefreshToken",
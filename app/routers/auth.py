@@ -1,58 +1,93 @@
-import secrets
-from fastapi import APIRouter, Depends, HTTPException
-from jose import jwt, JWTError
-from sqlalchemy.orm import Session
+import logging
+import math
+
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta, datetime
 from fastapi.security import OAuth2PasswordRequestForm
 from starlette import status
-from app.core.database import get_db
-from app.crud.user import get_user_by_name, get_user_by_email
+from app.core.database import AsyncSessionLocal, get_async_db
+from app.crud.async_user import get_user_by_name
 from app.schemas.user import UserCreate, UserResponse
-from app.crud import user as user_crud
-from app.utils.security import create_access_token, verify_password
+from app.crud import async_user as user_crud
+from app.crud import async_token as token_crud
+from app.utils.jwt_keys import key_ring
+from app.utils.password_hasher import password_hasher
+from app.utils.rate_limit import login_limiter
+from app.utils.security import create_access_token
 from pydantic import BaseModel
 from app.core.config import settings
-from app.models.token import RefreshToken
 
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
+logger = logging.getLogger(__name__)
 
 
 @router.post("/register", summary="Register a new user")
-def register(user_in: UserCreate, db: Session = Depends(get_db)):
-    if get_user_by_name(db, user_in.username):  # ✅ username
-        raise HTTPException(status_code=400, detail="Username already taken")
-    if get_user_by_email(db, user_in.email):
+async def register(user_in: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    # INSERT ... ON CONFLICT DO NOTHING: the unique indexes decide, no existence SELECTs up front
+    user = await user_crud.create_user(db, user_in)
+    if user is None:
+        if await get_user_by_name(db, user_in.username):  # ✅ username
+            raise HTTPException(status_code=400, detail="Username already taken")
         raise HTTPException(status_code=400, detail="Email already registered")
-
-    user = user_crud.create_user(db, user_in)
     return {"message": "User registered successfully", "id": user.id}
 
 
+async def _upgrade_password_hash(user_id: int, old_hash: str, password: str):
+    # Runs after the response is sent; on any failure the next login simply tries again
+    try:
+        new_hash = await password_hasher.hash(password)
+        async with AsyncSessionLocal() as db:
+            await user_crud.upgrade_password_hash(db, user_id, old_hash, new_hash)
+    except Exception:
+        logger.warning("Could not upgrade the password hash of user %s", user_id, exc_info=True)
+
+
 @router.post("/login")
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = user_crud.get_user_by_name(db, form_data.username)  # ✅ username
-    if not user or not verify_password(form_data.password, user.password_hash):
+async def login(
+    request: Request,
+    background_tasks: BackgroundTasks,
+    form_data: OAuth2PasswordRequestForm = Depends(),
+    db: AsyncSession = Depends(get_async_db)
+):
+    # Throttle before the user lookup and bcrypt, so a credential-stuffing burst stays cheap
+    if settings.LOGIN_RATE_LIMIT_ENABLED:
+        client_ip = request.client.host if request.client else "unknown"
+        retry_after = await login_limiter.check(client_ip, form_data.username)
+        if retry_after:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many login attempts, please retry later",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+    user = await user_crud.authenticate_user(db, form_data.username, form_data.password)  # ✅ username
+    if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
 
+    if settings.LOGIN_RATE_LIMIT_ENABLED:
+        await login_limiter.login_succeeded(form_data.username)
+    # Hash made under an older cost or scheme: migrate it now that we know the password
+    if settings.PASSWORD_REHASH_ON_LOGIN and password_hasher.needs_update(user.password_hash):
+        background_tasks.add_task(_upgrade_password_hash, user.id, user.password_hash, form_data.password)
+
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     refresh_token_expires = timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
 
     access_token = create_access_token(
-        data={"sub": user.username, "role": user.role},  # ✅ changed to username
+        data={"sub": user.username, "role": user.role, "tv": user.token_version},  # ✅ changed to username
         expires_delta=access_token_expires
     )
 
-    refresh_token = secrets.token_urlsafe(64)
     expires_at = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
-
-    db_refresh = RefreshToken(user_id=user.id, token=refresh_token, expires_at=expires_at)
-    db.add(db_refresh)
-    db.commit()
+    refresh_token = await token_crud.issue_refresh_token(
+        db, user.id, expires_at, max_active=settings.REFRESH_TOKEN_MAX_PER_USER
+    )
 
     return {
         "access_token": access_token,
@@ -65,20 +100,42 @@ class TokenRefreshRequest(BaseModel):
     refresh_token: str
 
 
+async def _rotate_refresh_token(token: str, db: AsyncSession) -> dict:
+    expires_at = datetime.utcnow() + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    rotated = await token_crud.rotate_refresh_token(db, token, expires_at)
+    if rotated is None:
+        outcome = await token_crud.reject_refresh_token(db, token)
+        if outcome == "reused":
+            # Both the thief and the owner hold this family now; neither may keep it
+            logger.warning("Rotated refresh token replayed, session revoked (token %s)", token.split(".")[0])
+        if outcome == "expired":
+            raise HTTPException(status_code=401, detail="Refresh token expired")
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+
+    new_refresh_token, owner = rotated
+    new_access_token = create_access_token(
+        data={"sub": owner.username, "role": owner.role, "tv": owner.token_version},
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    return {"access_token": new_access_token, "refresh_token": new_refresh_token, "token_type": "bearer"}
+
+
 @router.post("/refresh")
-def refresh_access_token(body: TokenRefreshRequest, db: Session = Depends(get_db)):
-    db_token = db.query(RefreshToken).filter(RefreshToken.token == body.refresh_token).first()
+async def refresh_access_token(body: TokenRefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    if settings.REFRESH_TOKEN_ROTATION:
+        return await _rotate_refresh_token(body.refresh_token, db)
+
+    db_token = await token_crud.get_refresh_token(db, body.refresh_token)
     if not db_token:
         raise HTTPException(status_code=401, detail="Invalid refresh token")
 
     if db_token.expires_at < datetime.utcnow():
-        db.delete(db_token)
-        db.commit()
+        await token_crud.delete_refresh_token(db, db_token)
         raise HTTPException(status_code=401, detail="Refresh token expired")
 
     user = db_token.user
     new_access_token = create_access_token(
-        data={"sub": user.username, "role": user.role},  # ✅ username
+        data={"sub": user.username, "role": user.role, "tv": user.token_version},  # ✅ username
         expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
     )
 
@@ -86,10 +143,13 @@ def refresh_access_token(body: TokenRefreshRequest, db: Session = Depends(get_db
 
 
 @router.post("/logout")
-def logout(body: TokenRefreshRequest, db: Session = Depends(get_db)):
-    db_token = db.query(RefreshToken).filter(RefreshToken.token == body.refresh_token).first()
-    if not db_token:
+async def logout(body: TokenRefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    if not await token_crud.revoke_refresh_token(db, body.refresh_token):
         raise HTTPException(status_code=404, detail="Token not found")
-    db.delete(db_token)
-    db.commit()
-    return {"message": "Logged out successfully"}
\ No newline at end of file
+    return {"message": "Logged out successfully"}
+
+
+@router.get("/jwks.json", summary="Public keys that verify access tokens")
+async def jwks():
+    # Empty for HS256: a shared secret is never published
+    return key_ring.public_jwks()
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Response
+from starlette import status
+
+from app.core.startup import readiness
+
+
+router = APIRouter(prefix="/health", tags=["Health"])
+
+
+@router.get("/live", summary="Liveness probe")
+def liveness():
+    return {"status": "ok"}
+
+
+@router.get("/ready", summary="Readiness probe (503 until warm-up finished)")
+def readiness_probe(response: Response):
+    if not readiness.ready:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return readiness.status()
@@ -0,0 +1,74 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app.core import database
+from app.core.db_pool import pool_stats
+from app.core.instrumentation import metrics_registry
+from app.core.metrics import render_counter
+from app.core.replicas import replica_router
+from app.utils.password_hasher import password_hasher
+from app.utils.rate_limit import login_limiter
+from app.utils.token_cache import token_cache
+from app.utils.counts import count_cache
+from app.utils.token_reaper import token_reaper
+from app.utils.token_versions import token_version_listener, token_versions
+
+
+# Operational endpoints, unauthenticated: only mounted with INTERNAL_ENDPOINTS_ENABLED=true,
+# hidden from the docs, and /internal should still be blocked at the proxy
+router = APIRouter(prefix="/internal", tags=["Internal"], include_in_schema=False)
+
+
+@router.get("/stats/password-hashing")
+def password_hashing_stats():
+    return password_hasher.stats()
+
+
+@router.get("/stats/token-cache")
+def token_cache_stats():
+    return {
+        **token_cache.stats(),
+        "token_versions": token_versions.stats(),
+        "version_listener_connected": token_version_listener.connected if token_version_listener else None,
+    }
+
+
+@router.get("/stats/count-cache")
+def count_cache_stats():
+    return count_cache.stats()
+
+
+@router.get("/stats/db-pool")
+def db_pool_stats():
+    return {
+        "async": pool_stats(database.async_engine.sync_engine),
+        "sync": pool_stats(database.engine),
+        **{replica.name: pool_stats(replica.engine.sync_engine) for replica in replica_router.replicas},
+    }
+
+
+@router.get("/stats/replicas")
+def replica_stats():
+    return replica_router.stats()
+
+
+@router.get("/stats/token-reaper")
+def token_reaper_stats():
+    return token_reaper.stats()
+
+
+@router.get("/stats/rate-limit")
+def rate_limit_stats():
+    return login_limiter.stats()
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    # Prometheus text format, per route: requests, SQL statements, latency and DB time
+    lines = render_counter(
+        "login_attempts_blocked_total",
+        [({"key": key}, count) for key, count in login_limiter.blocked.items()],
+        "Login attempts rejected by the rate limiter, by limiting key",
+    )
+    body = metrics_registry.render() + "\n".join(lines) + "\n"
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
@@ -1,15 +1,28 @@
 from typing import Optional
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, literal, select, tuple_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
-from app.core.database import get_db
-from app.crud.token import revoke_all_tokens_for_user
-from app.crud.user import update_user_by_id, delete_user_by_id
-from app.models.token import RefreshToken
+from app.core.config import settings
+from app.core.database import async_engine, get_async_db
+from app.core.replicas import get_read_db
+from app.crud.async_user import USER_RESPONSE_COLUMNS, update_user_by_id, delete_user_by_id
 from app.schemas.user import UserCreate, UserUpdate, UserResponse, PasswordChangeRequest
-from app.crud import user as user_crud
-from app.utils.security import get_current_user, get_current_admin, owner_or_admin, verify_password, hash_password
+from app.crud import async_user as user_crud
+from app.crud.search import SEARCH_MODES, user_search_filter, user_search_ranking
+from app.utils import bulk_users
+from app.utils.counts import COUNT_MODES, count_total
+from app.utils.etag import collection_etag, etag_matches, not_modified, user_etag
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.password_hasher import password_hasher
+from app.utils.serialization import user_json, users_json
+from app.utils.streaming import MEDIA_TYPES, STREAM_FORMATS, UploadStreamingResponse, stream_rows
+from app.utils.security import get_current_user, get_current_admin, owner_or_admin
+from app.utils.token_cache import CachedUser
+from app.utils.token_versions import token_versions
 from app.models.user import User
 
 
@@ -17,127 +30,291 @@ router = APIRouter(prefix="/users", tags=["Users"])
 
 
 @router.post("/", response_model=UserResponse)
-def create_user(user: UserCreate, db: Session = Depends(get_db)):
-    return user_crud.create_user(db, user)
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    new_user = await user_crud.create_user(db, user)
+    if new_user is None:
+        raise HTTPException(status_code=400, detail="Username or email already registered")
+    if settings.FAST_SERIALIZATION:
+        return user_json(new_user)
+    return new_user
+
+
+def _stream_listing(query, fmt: str) -> StreamingResponse:
+    # Same filters and ordering, but only the UserResponse columns, read from a server-side cursor
+    return StreamingResponse(
+        stream_rows(query.with_only_columns(*USER_RESPONSE_COLUMNS), fmt),
+        media_type=MEDIA_TYPES[fmt]
+    )
+
+
+def _page_response(request: Request, response: Response, users):
+    # The page's ETag covers its rows' versions, so an unchanged page costs the query but no body
+    etag = collection_etag(request, users)
+    if etag_matches(request, etag):
+        return not_modified(etag, headers=dict(response.headers))
+    response.headers["ETag"] = etag
+    if settings.FAST_SERIALIZATION:
+        return users_json(users, headers=dict(response.headers))
+    return users
 
 
 @router.get("/", response_model=list[UserResponse], summary="List users with pagination and filtering")
-def list_users(
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_admin),
+async def list_users(
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    _: CachedUser = Depends(get_current_admin),
     skip: int = Query(0, ge=0, description="Number of records to skip"),
     limit: int = Query(7, ge=1, le=100, description="Max number of records to return"),
+    cursor: Optional[str] = Query(None, description="Keyset cursor from the X-Next-Cursor header of the previous page"),
     role: Optional[str] = Query(None, description="Filter by role (admin or user)"),
     search: Optional[str] = Query(None, description="Search by username"),
-    sort_by: Optional[str] = Query("id", description="Field to sort by (id, username, email, role)"),
-    sort_order: Optional[str] = Query("asc", description="Sort order: asc or desc")
+    search_mode: str = Query("contains", description="Search mode: contains, prefix or fuzzy"),
+    search_email: bool = Query(False, description="Also match the search against email"),
+    sort_by: Optional[str] = Query("id", description="Field to sort by (id, username, email, role, relevance)"),
+    sort_order: Optional[str] = Query("asc", description="Sort order: asc or desc"),
+    stream: Optional[str] = Query(None, description="ndjson, json or csv: stream every matching row instead of a page"),
+    count: Optional[str] = Query(None, description="exact or estimate: total number of matches in X-Total-Count")
 ):
-    query = db.query(User)
+    if search_mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"search_mode must be one of {', '.join(SEARCH_MODES)}")
+    if stream and stream not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"stream must be one of {', '.join(STREAM_FORMATS)}")
+    if count and count not in COUNT_MODES:
+        raise HTTPException(status_code=400, detail=f"count must be one of {', '.join(COUNT_MODES)}")
+
+    query = select(User)
+    dialect = async_engine.dialect.name
 
     # Filtering
     if role:
-        query = query.filter(User.role == role)
+        query = query.where(User.role == role)
     if search:
-        query = query.filter(User.username.ilike(f"%{search}%"))
+        query = query.where(user_search_filter(search, search_mode, search_email, dialect))
+
+    # Total over the filters (not just what's left after the cursor); cached or estimated, never per page
+    if count and not stream:
+        total, count_mode = await count_total(db, query, count)
+        response.headers["X-Total-Count"] = str(total)
+        response.headers["X-Total-Count-Mode"] = count_mode
+
+    # Relevance ranking (best match first) only makes sense for a search, and has no keyset cursor
+    if sort_by == "relevance" and search:
+        if cursor:
+            raise HTTPException(status_code=400, detail="Cursor pagination is not available for relevance sorting")
+        query = query.order_by(*user_search_ranking(search, search_email, dialect), User.id.asc())
+        if stream:
+            return _stream_listing(query, stream)
+        if settings.FAST_SERIALIZATION:
+            page = query.with_only_columns(*USER_RESPONSE_COLUMNS, User.version).offset(skip).limit(limit)
+            users = (await db.execute(page)).all()
+        else:
+            users = (await db.scalars(query.offset(skip).limit(limit))).all()
+        return _page_response(request, response, users)
 
     # Sorting
     valid_sort_fields = {
         "id": User.id,
         "username": User.username,
         "email": User.email,
-        "role": User.role
+        "role": func.coalesce(User.role, "")  # nullable column: keep keyset comparisons well-defined
         # Add more fields here if needed, e.g. "created_at": User.created_at
+        # (and their cursor value type in app.utils.pagination.CURSOR_VALUE_TYPES)
     }
 
-    sort_field = valid_sort_fields.get(sort_by, User.id)
+    if sort_by not in valid_sort_fields:
+        sort_by = "id"
+    sort_field = valid_sort_fields[sort_by]
+    sort_order = "desc" if sort_order.lower() == "desc" else "asc"
 
-    if sort_order.lower() == "desc":
-        query = query.order_by(sort_field.desc())
+    # id breaks ties so that every row has a unique position (needed by the cursor)
+    if sort_order == "desc":
+        query = query.order_by(sort_field.desc(), User.id.desc())
     else:
-        query = query.order_by(sort_field.asc())
+        query = query.order_by(sort_field.asc(), User.id.asc())
 
-    # Pagination
-    users = query.offset(skip).limit(limit).all()
-    return users
+    if stream:
+        return _stream_listing(query, stream)
+
+    # Pagination: keyset when a cursor is given, offset otherwise
+    if cursor:
+        if skip:
+            raise HTTPException(status_code=400, detail="Use either skip or cursor, not both")
+        last_value, last_id = decode_cursor(cursor, sort_by, sort_order)
+        position = tuple_(sort_field, User.id)
+        boundary = tuple_(literal(last_value), literal(last_id))
+        query = query.where(position < boundary if sort_order == "desc" else position > boundary)
+    else:
+        query = query.offset(skip)
+
+    # Fetch one extra row to know whether there is a next page
+    if settings.FAST_SERIALIZATION:
+        # Plain column rows: no identity map, no UserResponse validation
+        page = query.with_only_columns(*USER_RESPONSE_COLUMNS, User.version).limit(limit + 1)
+        users = (await db.execute(page)).all()
+    else:
+        users = (await db.scalars(query.limit(limit + 1))).all()
+    if len(users) > limit:
+        users = users[:limit]
+        last = users[-1]
+        last_value = last.id if sort_by == "id" else (getattr(last, sort_by) or "")
+        response.headers["X-Next-Cursor"] = encode_cursor(sort_by, sort_order, last_value, last.id)
+    return _page_response(request, response, users)
+
+
+@router.post("/import", summary="Bulk-create users from streamed CSV or NDJSON (Admin only)")
+async def import_users(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv or ndjson (default: from Content-Type)"),
+    _: CachedUser = Depends(get_current_admin)
+):
+    fmt = format or bulk_users.detect_format(request.headers.get("content-type"))
+    if fmt not in bulk_users.FORMATS:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson"
+        )
+    # The body is parsed as it arrives; each batch is hashed and inserted before the next is read,
+    # and its rows are reported (NDJSON, then a summary line) without keeping them around
+    return UploadStreamingResponse(
+        bulk_users.import_report(bulk_users.iter_records(request.stream(), fmt)),
+        media_type=MEDIA_TYPES["ndjson"]
+    )
+
+
+@router.get("/export", summary="Stream every user as NDJSON or CSV (Admin only)")
+async def export_users(
+    format: str = Query("ndjson", description="ndjson, json or csv"),
+    _: CachedUser = Depends(get_current_admin)
+):
+    if format not in STREAM_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(STREAM_FORMATS)}")
+    return StreamingResponse(
+        bulk_users.export_users(format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'}
+    )
 
 
 @router.get("/me", response_model=UserResponse)
-def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(
+    request: Request,
+    response: Response,
+    current_user: CachedUser = Depends(get_current_user)
+):
+    # The snapshot carries the version: a cached token answers a revalidation without touching the DB
+    etag = user_etag(current_user.id, current_user.version)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    if settings.FAST_SERIALIZATION:
+        return user_json(current_user, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return current_user
 
 
 @router.get("/{user_id}", response_model=UserResponse)
-def get_user(user_id: int, db: Session = Depends(get_db)):
-    db_user = user_crud.get_user(db, user_id)
+async def get_user(
+    user_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_read_db)
+):
+    if request.headers.get("if-none-match"):
+        # Revalidation: read only the version (primary-key lookup), load the row if it changed
+        version = await user_crud.get_user_version(db, user_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        etag = user_etag(user_id, version)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+    db_user = await user_crud.get_user(db, user_id)
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
+    etag = user_etag(db_user.id, db_user.version)
+    if settings.FAST_SERIALIZATION:
+        return user_json(db_user, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return db_user
 
 
-@router.put("/{user_id}", summary="Update a user (owner or admin)")
-def update_user(
+@router.put("/{user_id}", response_model=UserResponse, summary="Update a user (owner or admin)")
+async def update_user(
     user_id: int,
     user_data: UserUpdate,
-    db: Session = Depends(get_db),
-    _: User = Depends(owner_or_admin)  # The "_" means we don't reuse the return value
+    response: Response,
+    db: AsyncSession = Depends(get_async_db),
+    _: CachedUser = Depends(owner_or_admin)  # The "_" means we don't reuse the return value
 ):
-    updated_user = update_user_by_id(db, user_id, user_data)
+    try:
+        updated_user = await update_user_by_id(db, user_id, user_data)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Username or email already registered")
     if not updated_user:
         raise HTTPException(status_code=404, detail="User not found")
+    # Drops this worker's cached snapshot (the NOTIFY does it elsewhere), and records
+    # a token version bump from a password change
+    token_versions.revoke(user_id, updated_user.token_version)
+    etag = user_etag(updated_user.id, updated_user.version)
+    if settings.FAST_SERIALIZATION:
+        return user_json(updated_user, headers={"ETag": etag})
+    response.headers["ETag"] = etag
     return updated_user
 
 
 @router.delete("/{user_id}", summary="Delete any user (Admin only)")
-def delete_user_by_admin(
+async def delete_user_by_admin(
     user_id: int,
-    db: Session = Depends(get_db),
-    _: User = Depends(get_current_admin)
+    db: AsyncSession = Depends(get_async_db),
+    _: CachedUser = Depends(get_current_admin)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+    token_version = await delete_user_by_id(db, user_id)
+    if token_version is None:
         raise HTTPException(status_code=404, detail="User not found")
-
-    db.query(RefreshToken).filter(RefreshToken.user_id == user_id).delete()
-    db.delete(user)
-    db.commit()
+    token_versions.revoke(user_id, token_version)
 
     return {"message": f"User with ID {user_id} deleted successfully"}
 
 
 @router.post("/change-password", summary="Change your own password")
-def change_password(
+async def change_password(
     password_data: PasswordChangeRequest,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user)
 ):
+    user = await user_crud.get_user(db, current_user.id)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    # Don't hold a pooled connection during the two bcrypt calls
+    await db.close()
+
     # 1. Verify old password
-    if not verify_password(password_data.old_password, current_user.password_hash):
+    if not await password_hasher.verify(password_data.old_password, user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Old password is incorrect"
         )
 
-    # 2. Hash and store the new password
-    current_user.password_hash = hash_password(password_data.new_password)
-    db.commit()
-
-    # 3. Optional: Invalidate all refresh tokens for this user
-    db.query(RefreshToken).filter(RefreshToken.user_id == current_user.id).delete()
-    db.commit()
+    # 2. Hash and store the new password, 3. invalidate all refresh tokens (one transaction)
+    new_hash = await password_hasher.hash(password_data.new_password)
+    token_version = await user_crud.change_password(db, user.id, user.password_hash, new_hash)
+    if token_version is None:
+        raise HTTPException(status_code=409, detail="Password was changed concurrently, please retry")
+    # Access tokens issued before are rejected from now on, not just when they expire
+    token_versions.revoke(user.id, token_version)
 
     return {"message": "Password changed successfully. Please log in again."}
 
 
 @router.delete("/me", summary="Delete your own account")
-def delete_own_account(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+async def delete_own_account(
+    db: AsyncSession = Depends(get_async_db),
+    current_user: CachedUser = Depends(get_current_user)
 ):
-    # Remove user's refresh tokens for security
-    db.query(RefreshToken).filter(RefreshToken.user_id == current_user.id).delete()
-
-    # Delete the user account
-    db.delete(current_user)
-    db.commit()
+    # Remove user's refresh tokens for security and delete the account (one transaction)
+    token_version = await delete_user_by_id(db, current_user.id)
+    if token_version is not None:
+        token_versions.revoke(current_user.id, token_version)
 
-    return {"message": "Your account has been deleted."}
\ No newline at end of file
+    return {"message": "Your account has been deleted."}
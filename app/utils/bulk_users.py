@@ -0,0 +1,263 @@
+"""
+Bulk user import/export with streaming I/O.
+
+Used by POST /users/import and GET /users/export, and standalone:
+
+    python -m app.utils.bulk_users import users.csv > report.ndjson
+    python -m app.utils.bulk_users export --format csv > users.csv
+
+Imports are read line by line and processed in batches of
+BULK_IMPORT_BATCH_SIZE rows: validate, skip usernames/emails that already
+exist, hash the passwords across the process pool, then one multi-row
+INSERT ... ON CONFLICT DO NOTHING per batch. No DB connection is held while
+hashing. The per-row report is streamed back (NDJSON, then a summary line)
+as each batch commits. Exports stream id/username/email/role from a
+server-side cursor.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import sys
+from collections import deque
+from typing import AsyncIterator, Optional
+
+from pydantic import ValidationError
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, async_engine
+from app.crud.async_user import USER_RESPONSE_COLUMNS, find_taken, insert_users_batch
+from app.models.user import User
+from app.schemas.user import UserCreate
+from app.utils.password_hasher import password_hasher, pwd_context
+from app.utils.streaming import STREAM_FORMATS, stream_rows
+
+FORMATS = ("csv", "ndjson")
+
+
+def detect_format(content_type: Optional[str]) -> Optional[str]:
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in ("text/csv", "application/csv"):
+        return "csv"
+    if content_type in ("application/x-ndjson", "application/ndjson", "application/jsonl"):
+        return "ndjson"
+    return None
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split a stream of byte chunks into decoded lines without buffering the whole body."""
+    buffer = b""
+    first = True
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            if first:
+                line = line.removeprefix(b"\xef\xbb\xbf")  # UTF-8 BOM written by spreadsheet tools
+                first = False
+            yield line.decode("utf-8", errors="replace").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8", errors="replace").rstrip("\r")
+
+
+async def iter_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[tuple[int, object]]:
+    """Yield (line number, dict) per data row, or (line number, error message) for unparsable lines."""
+    if fmt == "csv":
+        async for item in _iter_csv_records(chunks):
+            yield item
+        return
+
+    line_no = 0
+    async for line in iter_lines(chunks):
+        line_no += 1
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield line_no, "Invalid JSON"
+            continue
+        yield line_no, record if isinstance(record, dict) else "Expected a JSON object"
+
+
+async def _iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, object]]:
+    # One csv.reader over the whole input, so quoted fields may span lines. It is fed from a
+    # queue that is only read once a record is complete (every quote closed), so the reader
+    # never runs dry in the middle of a record while the rest is still being uploaded.
+    pending = deque()
+    reader = csv.reader(iter(pending.popleft, None))
+    header = None
+    line_no = record_line = 0
+    open_quote = False
+    async for line in iter_lines(chunks):
+        line_no += 1
+        if not open_quote:
+            if not line.strip():
+                continue
+            record_line = line_no
+        pending.append(line + "\n")
+        open_quote ^= line.count('"') % 2 == 1
+        if open_quote:
+            continue
+
+        values = next(reader)
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            continue
+        if len(values) != len(header):
+            yield record_line, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        yield record_line, {name: value for name, value in zip(header, values) if value != ""}
+    if open_quote:
+        yield record_line, "Unterminated quoted field"
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(map(str, error['loc']))}: {error['msg']}" for error in exc.errors())
+
+
+def _parse_row(record: dict) -> tuple[UserCreate | None, dict | None, str | None]:
+    """Validate one record into the INSERT values; returns (user, values, error)."""
+    password_hash = record.get("password_hash") if "password" not in record else None
+    if password_hash:
+        # Accept existing hashes (migrations from another system) when passlib recognises them
+        if not pwd_context.identify(password_hash):
+            return None, None, "password_hash: unsupported hash format"
+        record = {**record, "password": "placeholder"}
+    try:
+        user = UserCreate(**record)
+    except ValidationError as exc:
+        return None, None, _validation_message(exc)
+    values = {"username": user.username, "email": user.email, "role": user.role or "user"}
+    if password_hash:
+        values["password_hash"] = password_hash
+    return user, values, None
+
+
+async def _import_batch(batch: list[tuple[int, object]]) -> list[dict]:
+    results: dict[int, dict] = {}
+    pending: list[tuple[int, UserCreate, dict]] = []
+    seen_usernames, seen_emails = {}, {}
+
+    for line_no, record in batch:
+        if isinstance(record, str):
+            results[line_no] = {"line": line_no, "status": "invalid", "error": record}
+            continue
+        user, values, error = _parse_row(record)
+        if error:
+            results[line_no] = {"line": line_no, "username": record.get("username"), "status": "invalid", "error": error}
+            continue
+        duplicate_of = seen_usernames.get(user.username) or seen_emails.get(user.email)
+        if duplicate_of:
+            results[line_no] = {"line": line_no, "username": user.username, "status": "conflict",
+                                "error": f"Duplicate of line {duplicate_of}"}
+            continue
+        seen_usernames[user.username] = seen_emails[user.email] = line_no
+        pending.append((line_no, user, values))
+
+    # Skip rows that already exist before spending bcrypt time on them (re-running an import is cheap)
+    if pending:
+        async with AsyncSessionLocal() as db:
+            taken_usernames, taken_emails = await find_taken(
+                db, [user.username for _, user, _ in pending], [user.email for _, user, _ in pending]
+            )
+        fresh = []
+        for line_no, user, values in pending:
+            if user.username in taken_usernames or user.email in taken_emails:
+                results[line_no] = {"line": line_no, "username": user.username, "status": "conflict",
+                                    "error": "Username or email already registered"}
+            else:
+                fresh.append((line_no, user, values))
+        pending = fresh
+
+    to_hash = [(values, user.password) for _, user, values in pending if "password_hash" not in values]
+    hashes = await password_hasher.hash_many([password for _, password in to_hash])
+    for (values, _), hashed in zip(to_hash, hashes):
+        values["password_hash"] = hashed
+
+    if pending:
+        async with AsyncSessionLocal() as db:
+            created = await insert_users_batch(db, [values for _, _, values in pending])
+        for line_no, user, _ in pending:
+            if user.username in created:
+                results[line_no] = {"line": line_no, "username": user.username, "status": "created",
+                                    "id": created[user.username]}
+            else:
+                # Lost a race with a concurrent insert
+                results[line_no] = {"line": line_no, "username": user.username, "status": "conflict",
+                                    "error": "Username or email already registered"}
+
+    return [results[line_no] for line_no, _ in batch]
+
+
+async def import_users(records: AsyncIterator[tuple[int, object]], batch_size: Optional[int] = None) -> AsyncIterator[dict]:
+    """Import the records batch by batch, yielding one result per row in input order."""
+    batch_size = batch_size or settings.BULK_IMPORT_BATCH_SIZE
+    batch = []
+    async for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            for result in await _import_batch(batch):
+                yield result
+            batch = []
+    if batch:
+        for result in await _import_batch(batch):
+            yield result
+
+
+async def import_report(records: AsyncIterator[tuple[int, object]]) -> AsyncIterator[bytes]:
+    """NDJSON report: one line per row as its batch is committed, then a {"summary": ...} line."""
+    summary = {"created": 0, "conflict": 0, "invalid": 0}
+    async for result in import_users(records):
+        summary[result["status"]] += 1
+        yield json.dumps(result).encode() + b"\n"
+    yield json.dumps({"summary": summary}).encode() + b"\n"
+
+
+def export_users(fmt: str = "ndjson") -> AsyncIterator[bytes]:
+    """Every user ordered by id, streamed from a server-side cursor."""
+    return stream_rows(select(*USER_RESPONSE_COLUMNS).order_by(User.id), fmt)
+
+
+async def _file_chunks(path: str, size: int = 64 * 1024) -> AsyncIterator[bytes]:
+    with (sys.stdin.buffer if path == "-" else open(path, "rb")) as f:
+        while chunk := f.read(size):
+            yield chunk
+
+
+async def _run_import(path: str, fmt: Optional[str], batch_size: Optional[int]):
+    fmt = fmt or ("csv" if path.lower().endswith(".csv") else "ndjson")
+    password_hasher.start()
+    try:
+        summary = {"created": 0, "conflict": 0, "invalid": 0}
+        async for result in import_users(iter_records(_file_chunks(path), fmt), batch_size):
+            summary[result["status"]] += 1
+            print(json.dumps(result), flush=True)
+        print(f"Imported: {summary}", file=sys.stderr)
+    finally:
+        password_hasher.shutdown()
+
+
+async def _main(args):
+    try:
+        if args.command == "export":
+            async for chunk in export_users(args.format):
+                sys.stdout.buffer.write(chunk)
+        else:
+            await _run_import(args.path, args.format, args.batch_size)
+    finally:
+        # Pooled connections would otherwise keep the process alive
+        await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import/export users")
+    commands = parser.add_subparsers(dest="command", required=True)
+    import_parser = commands.add_parser("import", help="Create users from a CSV/NDJSON file, printing a per-row report")
+    import_parser.add_argument("path", help="Input file, or - for stdin")
+    import_parser.add_argument("--format", choices=FORMATS, help="Default: from the file extension")
+    import_parser.add_argument("--batch-size", type=int, default=None)
+    export_parser = commands.add_parser("export", help="Write every user to stdout")
+    export_parser.add_argument("--format", choices=STREAM_FORMATS, default="ndjson")
+    asyncio.run(_main(parser.parse_args()))
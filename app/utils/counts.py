@@ -0,0 +1,106 @@
+"""
+Total counts for paginated listings (GET /users/?count=exact|estimate -> X-Total-Count).
+
+exact     COUNT(*) over the filtered query, cached per filter set for
+          COUNT_CACHE_TTL_SECONDS: paging through a result set counts it once,
+          not once per page.
+estimate  The planner's row estimate, on PostgreSQL: pg_class.reltuples when
+          the query has no filter, EXPLAIN when it has. Estimates below
+          COUNT_ESTIMATE_EXACT_BELOW are replaced by an exact (cached) count,
+          since small results are cheap to count and that is where estimates
+          are least accurate. Other databases always count exactly.
+
+X-Total-Count-Mode tells the client which one it got.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+
+COUNT_MODES = ("exact", "estimate")
+
+
+class CountCache:
+    def __init__(self, ttl_seconds: float, max_size: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[tuple, tuple[float, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[int]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: tuple, total: int):
+        if self.ttl_seconds <= 0:
+            return
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, total)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+count_cache = CountCache(ttl_seconds=settings.COUNT_CACHE_TTL_SECONDS)
+
+
+def _unordered(query):
+    return query.order_by(None).limit(None).offset(None)
+
+
+async def exact_count(db: AsyncSession, query) -> int:
+    query = _unordered(query)
+    compiled = query.compile(dialect=db.get_bind().dialect)
+    key = (str(compiled), tuple(sorted(compiled.params.items())))
+    total = count_cache.get(key)
+    if total is None:
+        total = await db.scalar(select(func.count()).select_from(query.subquery()))
+        count_cache.set(key, total)
+    return total
+
+
+async def planner_estimate(db: AsyncSession, query) -> Optional[int]:
+    """PostgreSQL's row estimate for `query`, or None when the table was never analyzed."""
+    query = _unordered(query)
+    if query.whereclause is None:
+        table = query.get_final_froms()[0]
+        # -1 (PostgreSQL 14+) or 0 before the first VACUUM/ANALYZE
+        rows = await db.scalar(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = CAST(:table AS regclass)"),
+            {"table": table.name},
+        )
+        return rows if rows and rows > 0 else None
+
+    # EXPLAIN can't take bind parameters for the statement it explains: inline them as literals.
+    # Connect first: string literal escaping depends on the server's standard_conforming_strings.
+    connection = await db.connection()
+    sql = str(query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True}))
+    plan = (await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}")).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+async def count_total(db: AsyncSession, query, mode: str) -> tuple[int, str]:
+    """Returns (total, mode actually used)."""
+    if mode == "estimate" and db.get_bind().dialect.name == "postgresql":
+        estimate = await planner_estimate(db, query)
+        if estimate is not None and estimate >= settings.COUNT_ESTIMATE_EXACT_BELOW:
+            return estimate, "estimate"
+    return await exact_count(db, query), "exact"
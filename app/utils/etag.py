@@ -0,0 +1,39 @@
+"""
+Conditional GETs for user resources.
+
+Every users row has a `version` that each write to it increments. A user's
+ETag is built from (id, version) only, so checking If-None-Match needs either
+the cached snapshot (GET /users/me) or one primary-key lookup of the version
+(GET /users/{id}). A list page's ETag hashes the (id, version) pairs of the
+rows on it, together with the query string, so it changes whenever a row on
+the page is updated, added, removed or reordered.
+"""
+import hashlib
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+
+
+def user_etag(user_id: int, version: int) -> str:
+    return f'"u{user_id}-v{version}"'
+
+
+def collection_etag(request: Request, rows: Iterable) -> str:
+    digest = hashlib.blake2b(str(request.query_params).encode(), digest_size=16)
+    for row in rows:
+        digest.update(b"%d:%d," % (row.id, row.version))
+    return f'"c{digest.hexdigest()}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/ prefixes are ignored."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in header.split(","))
+
+
+def not_modified(etag: str, headers: Optional[dict] = None) -> Response:
+    return Response(status_code=304, headers={**(headers or {}), "ETag": etag})
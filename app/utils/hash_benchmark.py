@@ -0,0 +1,84 @@
+"""
+Pick password hashing costs for this machine.
+
+    python -m app.utils.hash_benchmark --target-ms 250
+    python -m app.utils.hash_benchmark --scheme argon2 --target-ms 300
+
+Times candidate costs (median of --samples hashes, one core) and recommends
+the most expensive one whose median stays within the target. The output
+also shows the login throughput that PASSWORD_HASH_WORKERS processes could
+sustain at that cost. Put the recommendation in the PASSWORD_* settings;
+existing hashes move to it as users log in.
+"""
+import argparse
+import statistics
+import time
+
+from passlib.exc import MissingBackendError
+
+from app.core.config import settings
+from app.utils.password_hasher import build_crypt_context
+
+
+def _candidates(scheme: str) -> list[dict]:
+    if scheme == "bcrypt":
+        return [{"bcrypt_rounds": rounds} for rounds in range(10, 16)]
+    # argon2: memory cost first (what makes GPUs expensive), then passes
+    return [
+        {"argon2_memory_cost": memory, "argon2_time_cost": time_cost}
+        for memory in (19456, 47104, 65536, 131072)
+        for time_cost in (1, 2, 3, 4)
+    ]
+
+
+def _time_hash(scheme: str, params: dict, samples: int) -> float:
+    policy = {
+        "bcrypt_rounds": settings.PASSWORD_BCRYPT_ROUNDS,
+        "argon2_time_cost": settings.PASSWORD_ARGON2_TIME_COST,
+        "argon2_memory_cost": settings.PASSWORD_ARGON2_MEMORY_COST,
+        "argon2_parallelism": settings.PASSWORD_ARGON2_PARALLELISM,
+        **params,
+    }
+    context = build_crypt_context(scheme, **policy)
+    context.hash("warm-up")
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        context.hash("correct horse battery staple")
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark password hashing costs")
+    parser.add_argument("--scheme", choices=["bcrypt", "argon2"], default=settings.PASSWORD_HASH_SCHEME)
+    parser.add_argument("--target-ms", type=float, default=250, help="Latency budget for one hash/verify")
+    parser.add_argument("--samples", type=int, default=5)
+    args = parser.parse_args()
+
+    workers = max(settings.PASSWORD_HASH_WORKERS, 1)
+    best = None
+    print(f"{args.scheme}, target {args.target_ms:.0f} ms, {workers} hashing workers")
+    for params in _candidates(args.scheme):
+        try:
+            median_ms = _time_hash(args.scheme, params, args.samples)
+        except MissingBackendError:
+            raise SystemExit(f"No {args.scheme} backend installed (argon2 needs `pip install argon2-cffi`)")
+        fits = median_ms <= args.target_ms
+        print(f"  {params}: {median_ms:8.1f} ms  (~{workers * 1000 / median_ms:7.1f} logins/s)"
+              f"{'' if fits else '  over budget'}")
+        if fits and (best is None or median_ms > best[0]):
+            best = (median_ms, params)
+        if not fits and args.scheme == "bcrypt":
+            break  # every further round doubles the cost
+
+    if best is None:
+        print("No candidate fits the target; use the cheapest one or add hashing capacity")
+        return
+    print("Recommended:")
+    for name, value in best[1].items():
+        print(f"  PASSWORD_{name.upper()}={value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+JWT signing and verification keys.
+
+HS* algorithms (the default) sign with settings.SECRET_KEY. For asymmetric
+algorithms (ES256, RS256, ...) the keys live in a local JWKS file
+(JWT_KEYS_FILE): the first key that has a private part signs and every key
+in the file verifies, selected by the token's `kid` header. Processes that
+only verify tokens (gateways, edge workers) get a file with the public keys
+only, e.g. from GET /auth/jwks.json or `python -m app.utils.jwt_keys public`.
+
+Keys are parsed once into jose Key objects and reused on every call; the file
+is re-read when its mtime changes (checked every JWT_KEYS_RELOAD_SECONDS, and
+at most once a second when a token arrives with an unknown kid).
+
+Rotation:
+
+    python -m app.utils.jwt_keys generate --keep 3   # new signing key first, keeps the last 3
+
+Old keys stay in the file so tokens they signed verify until they expire.
+"""
+import argparse
+import json
+import os
+import secrets
+import threading
+import time
+from typing import Optional
+
+from jose import JWTError, jwk, jwt
+from jose.backends.base import Key
+
+from app.core.config import settings
+
+
+def _is_symmetric(algorithm: str) -> bool:
+    return algorithm.startswith("HS")
+
+
+class KeyRing:
+    def __init__(self, algorithm: str, secret: str, keys_file: str, reload_interval: float):
+        self.algorithm = algorithm
+        self.secret = secret
+        self.keys_file = keys_file
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._mtime: Optional[float] = None
+        self._checked_at = 0.0
+        self._signing: Optional[tuple[Optional[str], Key]] = None
+        self._verification: dict[Optional[str], Key] = {}
+        self._public_jwks: list[dict] = []
+
+    def _read_file(self) -> list[dict]:
+        if not self.keys_file:
+            raise RuntimeError(f"JWT_KEYS_FILE must be set to use {self.algorithm}")
+        with open(self.keys_file) as f:
+            return json.load(f)["keys"]
+
+    def _load(self):
+        if _is_symmetric(self.algorithm):
+            key = jwk.construct(self.secret, self.algorithm)
+            self._signing, self._verification, self._public_jwks = (None, key), {None: key}, []
+            self._loaded = True
+            return
+
+        mtime = os.stat(self.keys_file).st_mtime if self.keys_file else None
+        signing, verification, public_jwks = None, {}, []
+        for data in self._read_file():
+            if data.get("alg", self.algorithm) != self.algorithm:
+                continue
+            key = jwk.construct(data, self.algorithm)
+            public_key = key.public_key() if "d" in data else key
+            verification[data["kid"]] = public_key
+            public_jwks.append({**public_key.to_dict(), "kid": data["kid"], "use": "sig"})
+            if signing is None and "d" in data:
+                signing = (data["kid"], key)
+
+        self._signing, self._verification, self._public_jwks = signing, verification, public_jwks
+        self._mtime = mtime
+        self._loaded = True
+
+    def _refresh(self, force: bool = False):
+        """Load on first use, then reload when the keys file has changed."""
+        now = time.monotonic()
+        if self._loaded and now - self._checked_at < (1.0 if force else self.reload_interval):
+            return
+        with self._lock:
+            self._checked_at = now
+            if not self._loaded:
+                self._load()
+            elif self.keys_file and not _is_symmetric(self.algorithm):
+                if os.stat(self.keys_file).st_mtime != self._mtime:
+                    self._load()
+
+    def encode(self, claims: dict) -> str:
+        self._refresh()
+        if self._signing is None:
+            raise RuntimeError("No private key in JWT_KEYS_FILE, this process can only verify tokens")
+        kid, key = self._signing
+        headers = {"kid": kid} if kid else None
+        return jwt.encode(claims, key, algorithm=self.algorithm, headers=headers)
+
+    def decode(self, token: str) -> dict:
+        """Verify and decode a token; raises JWTError when it is invalid or expired."""
+        self._refresh()
+        kid = None if _is_symmetric(self.algorithm) else jwt.get_unverified_header(token).get("kid")
+        key = self._verification.get(kid)
+        if key is None:
+            # Possibly signed with a key rotated in after our last reload
+            self._refresh(force=True)
+            key = self._verification.get(kid)
+            if key is None:
+                raise JWTError("Unknown signing key")
+        return jwt.decode(token, key, algorithms=[self.algorithm])
+
+    def public_jwks(self) -> dict:
+        self._refresh()
+        return {"keys": list(self._public_jwks)}
+
+
+key_ring = KeyRing(
+    algorithm=settings.ALGORITHM,
+    secret=settings.SECRET_KEY,
+    keys_file=settings.JWT_KEYS_FILE,
+    reload_interval=settings.JWT_KEYS_RELOAD_SECONDS,
+)
+
+
+def generate_key(algorithm: str) -> dict:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import ec, rsa
+
+    curves = {"ES256": ec.SECP256R1, "ES384": ec.SECP384R1, "ES512": ec.SECP521R1}
+    if algorithm in curves:
+        private_key = ec.generate_private_key(curves[algorithm]())
+    elif algorithm[:2] in ("RS", "PS"):
+        private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    else:
+        raise SystemExit(f"Cannot generate a key for {algorithm}")
+
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    )
+    kid = time.strftime("%Y%m%d") + "-" + secrets.token_hex(4)
+    return {**jwk.construct(pem, algorithm).to_dict(), "kid": kid, "use": "sig"}
+
+
+def _write_keys(path: str, keys: list[dict]):
+    # Atomic replace, readable by the owner only (the file holds private keys)
+    tmp = f"{path}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w") as f:
+        json.dump({"keys": keys}, f, indent=2)
+    os.replace(tmp, path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Manage the JWT signing key set")
+    parser.add_argument("command", choices=["generate", "public"],
+                        help="generate: add a new signing key; public: print the public JWKS")
+    parser.add_argument("--keys-file", default=settings.JWT_KEYS_FILE or "jwks.json")
+    parser.add_argument("--alg", default=settings.ALGORITHM if not _is_symmetric(settings.ALGORITHM) else "ES256")
+    parser.add_argument("--keep", type=int, default=3, help="Keys to keep after generating (newest first)")
+    args = parser.parse_args()
+
+    if args.command == "generate":
+        existing = json.load(open(args.keys_file))["keys"] if os.path.exists(args.keys_file) else []
+        new_key = generate_key(args.alg)
+        _write_keys(args.keys_file, ([new_key] + existing)[:max(args.keep, 1)])
+        print(f"Added signing key {new_key['kid']} ({args.alg}) to {args.keys_file}")
+    else:
+        ring = KeyRing(args.alg, "", args.keys_file, reload_interval=0)
+        print(json.dumps(ring.public_jwks(), indent=2))
@@ -0,0 +1,42 @@
+import base64
+import json
+from typing import Any
+
+from fastapi import HTTPException, status
+
+
+def encode_cursor(sort_by: str, sort_order: str, value: Any, last_id: int) -> str:
+    """Opaque keyset cursor: the (sort value, id) of the last row on the page."""
+    payload = json.dumps({"s": sort_by, "o": sort_order, "v": value, "id": last_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+# Type of the sort value stored in the cursor, per list_users sort field
+CURSOR_VALUE_TYPES = {"id": int, "username": str, "email": str, "role": str}
+MAX_ID = 2**31 - 1  # users.id is an INTEGER
+
+
+def _is_id(value: Any) -> bool:
+    # bool is an int subclass, and JSON true must not pass for an id
+    return type(value) is int and 0 <= value <= MAX_ID
+
+
+def decode_cursor(cursor: str, sort_by: str, sort_order: str) -> tuple[Any, int]:
+    invalid_cursor = HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, last_id = payload["v"], payload["id"]
+    except (ValueError, KeyError, TypeError):
+        raise invalid_cursor
+
+    # A cursor only makes sense for the ordering it was produced with
+    if payload.get("s") != sort_by or payload.get("o") != sort_order:
+        raise invalid_cursor
+    # Hand-edited values must not reach the keyset comparison with the wrong type
+    expected = CURSOR_VALUE_TYPES.get(sort_by)
+    if not _is_id(last_id) or expected is None:
+        raise invalid_cursor
+    if not (_is_id(value) if expected is int else type(value) is expected):
+        raise invalid_cursor
+    return value, last_id
@@ -0,0 +1,149 @@
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Optional
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+
+from app.core.config import settings
+from app.core.metrics import LatencyHistogram
+
+
+def build_crypt_context(scheme: str, bcrypt_rounds: int, argon2_time_cost: int,
+                        argon2_memory_cost: int, argon2_parallelism: int) -> CryptContext:
+    """
+    Hashing policy: new hashes use `scheme` with exactly these costs. Hashes
+    made with the other scheme, or with a different bcrypt cost (higher or
+    lower), are reported by needs_update() and get rehashed at the next login.
+    """
+    schemes = ["bcrypt", "argon2"]
+    schemes.remove(scheme)
+    return CryptContext(
+        schemes=[scheme] + schemes,
+        deprecated="auto",
+        bcrypt__rounds=bcrypt_rounds,
+        bcrypt__min_rounds=bcrypt_rounds,
+        bcrypt__max_rounds=bcrypt_rounds,
+        argon2__time_cost=argon2_time_cost,
+        argon2__memory_cost=argon2_memory_cost,
+        argon2__parallelism=argon2_parallelism,
+    )
+
+
+# Password hashing context (built from Settings, so worker processes get the same policy)
+pwd_context = build_crypt_context(
+    settings.PASSWORD_HASH_SCHEME,
+    bcrypt_rounds=settings.PASSWORD_BCRYPT_ROUNDS,
+    argon2_time_cost=settings.PASSWORD_ARGON2_TIME_COST,
+    argon2_memory_cost=settings.PASSWORD_ARGON2_MEMORY_COST,
+    argon2_parallelism=settings.PASSWORD_ARGON2_PARALLELISM,
+)
+
+
+# Module-level so they can be pickled and executed inside the worker processes
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _hash_many(passwords: list[str]) -> list[str]:
+    return [pwd_context.hash(password) for password in passwords]
+
+
+# Passwords per worker job in hash_many(): small enough that interactive
+# logins queued behind a bulk import only wait for one short job
+HASH_BATCH_CHUNK = 8
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a process pool so hashing neither holds the GIL nor
+    blocks the event loop. At most `max_queue` operations may be in flight;
+    anything beyond that is rejected with 503 instead of piling up.
+    """
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self.rejected = 0
+        self.metrics = {"hash": LatencyHistogram(), "verify": LatencyHistogram(), "hash_batch": LatencyHistogram()}
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Optional[Executor]:
+        # workers == 0 → fall back to the event loop's default thread pool
+        if self._executor is None and self.workers > 0:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def start(self):
+        self._get_executor()
+
+    async def warm_up(self):
+        # One hash per worker forces every process to spawn and import passlib/bcrypt
+        await asyncio.gather(*(self.hash("warm-up") for _ in range(max(self.workers, 1))))
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    async def _submit(self, operation: str, func, *args):
+        if self.pending >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        self.pending += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.pending -= 1
+            self.metrics[operation].observe(time.perf_counter() - start)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit("hash", _hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit("verify", _verify, plain_password, hashed_password)
+
+    @staticmethod
+    def needs_update(hashed_password: str) -> bool:
+        # Cheap (parses the hash header only), safe to call on the event loop
+        return pwd_context.needs_update(hashed_password)
+
+    async def hash_many(self, passwords: list[str]) -> list[str]:
+        """Hash a batch across all workers, with at most one queued job per worker at a time."""
+        chunks = [passwords[i:i + HASH_BATCH_CHUNK] for i in range(0, len(passwords), HASH_BATCH_CHUNK)]
+        limit = asyncio.Semaphore(max(self.workers, 1))
+
+        async def run(chunk):
+            async with limit:
+                return await self._submit("hash_batch", _hash_many, chunk)
+
+        results = await asyncio.gather(*(run(chunk) for chunk in chunks))
+        return [hashed for chunk in results for hashed in chunk]
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "pending": self.pending,
+            "rejected": self.rejected,
+            "latency": {name: hist.snapshot() for name, hist in self.metrics.items()},
+        }
+
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE,
+)
@@ -0,0 +1,241 @@
+"""
+Sliding-window rate limiting for /auth/login.
+
+Each key (client IP, username) has a counter per fixed window. The sliding
+count is the current window's hits plus the previous window's, weighted by
+how much of the previous window still overlaps the sliding one. Only two
+integers are stored per key; the weighting assumes the previous window's
+hits were evenly spread.
+
+Counters live in process memory by default. Set
+LOGIN_RATE_LIMIT_BACKEND=redis to share them between nodes. Any server that
+speaks the Redis protocol (INCR/EXPIRE/GET/DEL) will do: Redis, Valkey,
+KeyDB, or a local stand-in in development. If that backend is unreachable,
+the limiter fails open and counts the error; it never locks everybody out.
+"""
+import asyncio
+import logging
+import math
+import time
+from typing import Optional
+from urllib.parse import urlparse
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryBackend:
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._counters: dict[str, tuple[int, float]] = {}  # key -> (count, expires_at)
+
+    def _sweep(self, now: float):
+        for key in [key for key, (_, expires_at) in self._counters.items() if expires_at <= now]:
+            del self._counters[key]
+        # Still full (e.g. a spray from many IPs): drop the oldest keys
+        while len(self._counters) >= self.max_keys:
+            self._counters.pop(next(iter(self._counters)))
+
+    async def incr(self, key: str, previous_key: str, ttl: float) -> tuple[int, int]:
+        now = time.monotonic()
+        count, expires_at = self._counters.get(key, (0, now + ttl))
+        if expires_at <= now:
+            count, expires_at = 0, now + ttl
+        if key not in self._counters and len(self._counters) >= self.max_keys:
+            self._sweep(now)
+        self._counters[key] = (count + 1, expires_at)
+        previous, previous_expires = self._counters.get(previous_key, (0, now))
+        return count + 1, previous if previous_expires > now else 0
+
+    async def delete(self, *keys: str):
+        for key in keys:
+            self._counters.pop(key, None)
+
+    async def close(self):
+        pass
+
+
+class RespBackend:
+    """Minimal Redis-protocol (RESP2) client: one connection, pipelined commands."""
+
+    def __init__(self, url: str, timeout: float = 0.5):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    @staticmethod
+    def _encode(*args) -> bytes:
+        parts = [f"*{len(args)}\r\n".encode()]
+        for arg in args:
+            data = str(arg).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+        return b"".join(parts)
+
+    async def _read_reply(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError("Connection closed by server")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"-":
+            raise RuntimeError(payload.decode())
+        if kind == b":":
+            return int(payload)
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"$":
+            length = int(payload)
+            if length < 0:
+                return None
+            return (await self._reader.readexactly(length + 2))[:-2].decode()
+        if kind == b"*":
+            return [await self._read_reply() for _ in range(int(payload))]
+        raise ConnectionError(f"Unexpected reply {line!r}")
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        for command in setup:
+            self._writer.write(self._encode(*command))
+            await self._read_reply()
+
+    async def execute(self, *commands: tuple) -> list:
+        async with self._lock:
+            try:
+                return await asyncio.wait_for(self._pipeline(commands), self.timeout)
+            except BaseException:
+                # A half-read reply would desynchronise the connection: start over next time
+                await self.close()
+                raise
+
+    async def _pipeline(self, commands) -> list:
+        if self._writer is None:
+            await self._connect()
+        self._writer.write(b"".join(self._encode(*command) for command in commands))
+        await self._writer.drain()
+        return [await self._read_reply() for _ in commands]
+
+    async def incr(self, key: str, previous_key: str, ttl: float) -> tuple[int, int]:
+        count, _, previous = await self.execute(
+            ("INCR", key), ("EXPIRE", key, math.ceil(ttl)), ("GET", previous_key)
+        )
+        return count, int(previous or 0)
+
+    async def delete(self, *keys: str):
+        await self.execute(("DEL", *keys))
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+
+class SlidingWindowLimiter:
+    def __init__(self, backend, name: str, limit: int, window: float):
+        self.backend = backend
+        self.name = name
+        self.limit = limit
+        self.window = window
+
+    def _keys(self, key: str, now: float) -> tuple[str, str, float]:
+        bucket = int(now // self.window)
+        elapsed = now - bucket * self.window
+        prefix = f"ratelimit:{self.name}:{key}"
+        return f"{prefix}:{bucket}", f"{prefix}:{bucket - 1}", elapsed
+
+    async def hit(self, key: str) -> float:
+        """Count an attempt; returns 0 if it is allowed, otherwise seconds until the next one would be."""
+        now = time.time()
+        current_key, previous_key, elapsed = self._keys(key, now)
+        # Two windows of TTL: the counter is still read as "previous" during the next window
+        current, previous = await self.backend.incr(current_key, previous_key, 2 * self.window)
+        weight = 1 - elapsed / self.window
+        if previous * weight + current <= self.limit:
+            return 0.0
+        if current > self.limit or previous == 0:
+            return self.window - elapsed
+        # Time until the previous window's share has decayed enough
+        allowed_at = self.window * (1 - (self.limit - current) / previous)
+        return max(allowed_at - elapsed, 1.0)
+
+    async def reset(self, key: str):
+        now = time.time()
+        current_key, previous_key, _ = self._keys(key, now)
+        await self.backend.delete(current_key, previous_key)
+
+
+class LoginRateLimiter:
+    """
+    Throttles /auth/login per client IP (all attempts) and per username
+    (attempts since the last successful login), before any DB or bcrypt work.
+    """
+
+    def __init__(self, backend, ip_limit: int, username_limit: int, window: float):
+        self.backend = backend
+        self.by_ip = SlidingWindowLimiter(backend, "login-ip", ip_limit, window)
+        self.by_username = SlidingWindowLimiter(backend, "login-user", username_limit, window)
+        self.blocked = {"ip": 0, "username": 0}
+        self.backend_errors = 0
+
+    @staticmethod
+    def _username_key(username: str) -> str:
+        return username.strip().lower()[:256]
+
+    async def check(self, ip: str, username: str) -> float:
+        """Count the attempt; returns the Retry-After seconds when it must be rejected, else 0."""
+        try:
+            retry_ip = await self.by_ip.hit(ip)
+            retry_username = await self.by_username.hit(self._username_key(username))
+        except Exception:
+            self.backend_errors += 1
+            logger.warning("Login rate limiter backend unavailable, allowing the attempt", exc_info=True)
+            return 0.0
+
+        if retry_ip:
+            self.blocked["ip"] += 1
+        elif retry_username:
+            self.blocked["username"] += 1
+        return max(retry_ip, retry_username)
+
+    async def login_succeeded(self, username: str):
+        try:
+            await self.by_username.reset(self._username_key(username))
+        except Exception:
+            self.backend_errors += 1
+
+    async def close(self):
+        await self.backend.close()
+
+    def stats(self) -> dict:
+        return {
+            "backend": type(self.backend).__name__,
+            "window_seconds": self.by_ip.window,
+            "ip_limit": self.by_ip.limit,
+            "username_limit": self.by_username.limit,
+            "blocked": dict(self.blocked),
+            "backend_errors": self.backend_errors,
+        }
+
+
+def _make_backend():
+    if settings.LOGIN_RATE_LIMIT_BACKEND == "redis":
+        return RespBackend(settings.LOGIN_RATE_LIMIT_REDIS_URL)
+    return MemoryBackend()
+
+
+login_limiter = LoginRateLimiter(
+    _make_backend(),
+    ip_limit=settings.LOGIN_RATE_LIMIT_PER_IP,
+    username_limit=settings.LOGIN_RATE_LIMIT_PER_USERNAME,
+    window=settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS,
+)
@@ -2,27 +2,21 @@ from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from datetime import datetime, timedelta
 from typing import Optional
-from jose import jwt, JWTError
-from passlib.context import CryptContext
-from sqlalchemy.orm import Session
-from app.crud import user as user_crud
-from app.core.database import get_db
-from app.models.user import User
+from jose import JWTError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.crud import async_user as user_crud
+from app.core.database import get_async_db
+from app.core.replicas import get_read_db
 from app.core.config import settings
+from app.utils.jwt_keys import key_ring
+from app.utils.password_hasher import pwd_context
+from app.utils.token_cache import CachedUser, token_cache
+from app.utils.token_versions import token_versions
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
 
-# JWT config
-SECRET_KEY = "your_secret_key_here_change_this"  # store in env variable in production
-ALGORITHM = "HS256"
-ACCESS_TOKEN_EXPIRE_MINUTES = 30
-
-# Password hashing context
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
 def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
@@ -35,39 +29,61 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
     to_encode.update({"exp": expire})
-    return jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    return key_ring.encode(to_encode)
+
+
+def prime_jwt_keys():
+    # Load and parse the key set, then sign and verify a throwaway token, before traffic
+    token = create_access_token({"sub": "warm-up"}, expires_delta=timedelta(minutes=1))
+    key_ring.decode(token)
 
 
 def decode_access_token(token: str):
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        return key_ring.decode(token)
     except JWTError:
         return None
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+async def get_current_user(
+        token: str = Depends(oauth2_scheme),
+        db: AsyncSession = Depends(get_read_db)
+) -> CachedUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+    # Common path: a cached token whose version hasn't been revoked, zero queries
+    cached = token_cache.get(token)
+    if cached is not None:
+        payload, current_user = cached
+        if token_versions.is_revoked(current_user.id, payload.get("tv", 0)):
+            raise credentials_exception
+        return current_user
+
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        payload = key_ring.decode(token)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
     except JWTError:
         raise credentials_exception
 
-    user = user_crud.get_user_by_name(db, username)
+    user = await user_crud.get_user_by_name(db, username)
     if user is None:
         raise credentials_exception
-    return user
+    token_versions.observe(user.id, user.token_version)
+    if token_versions.is_revoked(user.id, payload.get("tv", 0)):
+        raise credentials_exception
+    # Routes get a detached snapshot; the ones that modify the user load the row by id
+    current_user = CachedUser.from_user(user)
+    token_cache.set(token, payload, current_user)
+    return current_user
 
 
-def get_current_admin(current_user: User = Depends(get_current_user)):
+async def get_current_admin(current_user: CachedUser = Depends(get_current_user)):
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -76,11 +92,11 @@ def get_current_admin(current_user: User = Depends(get_current_user)):
     return current_user
 
 
-def owner_or_admin(
+async def owner_or_admin(
         user_id: int,
-        db: Session = Depends(get_db),
-        current_user: User = Depends(get_current_user)
-) -> User:
+        db: AsyncSession = Depends(get_async_db),
+        current_user: CachedUser = Depends(get_current_user)
+) -> CachedUser:
     # If admin → allow
     if current_user.role == "admin":
         return current_user
@@ -0,0 +1,45 @@
+"""
+Opt-in fast path (FAST_SERIALIZATION) for routes that return UserResponse.
+
+The default path validates every ORM object into UserResponse (EmailStr
+included) and runs the result through jsonable_encoder. Rows read from our
+own database are already valid, so the fast path copies the four fields into
+dicts and lets a precompiled pydantic-core serializer write the JSON bytes
+directly, without any validation.
+"""
+from operator import attrgetter
+from typing import Iterable, Optional
+
+from fastapi import Response
+from pydantic import TypeAdapter
+from typing_extensions import TypedDict  # pydantic needs this one on Python < 3.12
+
+
+class UserRow(TypedDict):
+    # Same fields as UserResponse; role stays Optional so legacy NULLs serialize instead of warning
+    id: int
+    username: str
+    email: str
+    role: Optional[str]
+
+
+USER_FIELDS = ("id", "username", "email", "role")
+_user_adapter = TypeAdapter(UserRow)
+_users_adapter = TypeAdapter(list[UserRow])
+_get_fields = attrgetter(*USER_FIELDS)  # works on User, CachedUser and column Rows alike
+
+
+def user_json(user, headers: Optional[dict] = None) -> Response:
+    return Response(
+        content=_user_adapter.dump_json(dict(zip(USER_FIELDS, _get_fields(user)))),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+def users_json(users: Iterable, headers: Optional[dict] = None) -> Response:
+    return Response(
+        content=_users_adapter.dump_json([dict(zip(USER_FIELDS, _get_fields(user))) for user in users]),
+        media_type="application/json",
+        headers=headers,
+    )
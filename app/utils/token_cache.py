@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    """Compact, session-independent view of an authenticated user."""
+    id: int
+    username: str
+    email: str
+    role: str
+    version: int
+
+    @classmethod
+    def from_user(cls, user) -> "CachedUser":
+        return cls(id=user.id, username=user.username, email=user.email, role=user.role,
+                   version=user.version)
+
+
+class TokenCache:
+    """
+    In-process TTL + LRU cache of validated access tokens.
+
+    Entries never outlive the token's own `exp`. The cache is per worker
+    process, so invalidation only reaches the worker that handled the write;
+    the TTL bounds how stale other workers can be.
+    """
+
+    def __init__(self, ttl_seconds: int, max_size: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, tuple[float, dict, CachedUser]]" = OrderedDict()
+        self._tokens_by_user: dict[int, set[str]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_size > 0
+
+    def get(self, token: str) -> Optional[tuple[dict, CachedUser]]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, claims, user = entry
+            if expires_at <= time.time():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return claims, user
+
+    def set(self, token: str, claims: dict, user: CachedUser):
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl_seconds
+        if claims.get("exp") is not None:
+            expires_at = min(expires_at, float(claims["exp"]))
+        with self._lock:
+            self._remove(token)
+            self._entries[token] = (expires_at, claims, user)
+            self._tokens_by_user.setdefault(user.id, set()).add(token)
+            while len(self._entries) > self.max_size:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def invalidate_user(self, user_id: int):
+        with self._lock:
+            for token in list(self._tokens_by_user.get(user_id, ())):
+                self._remove(token)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+    def _remove(self, token: str):
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._tokens_by_user.get(entry[2].id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry[2].id]
+
+
+token_cache = TokenCache(
+    ttl_seconds=settings.TOKEN_CACHE_TTL_SECONDS,
+    max_size=settings.TOKEN_CACHE_MAX_SIZE,
+)
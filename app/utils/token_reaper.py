@@ -0,0 +1,126 @@
+"""
+Background deletion of expired refresh tokens.
+
+Runs inside the app (started from the lifespan when TOKEN_REAPER_ENABLED)
+or standalone via `python -m app.utils.token_reaper [--once]`.
+"""
+import argparse
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import LatencyHistogram
+from app.crud.async_token import delete_expired_tokens_batch
+
+logger = logging.getLogger(__name__)
+
+# pg advisory lock id, so only one worker process reaps at a time
+REAPER_LOCK_ID = 0x7265_6170
+
+
+class TokenReaper:
+    def __init__(self, interval: float, batch_size: int, batch_pause: float, max_batches: int):
+        self.interval = interval
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.max_batches = max_batches
+        self.runs = 0
+        self.total_reaped = 0
+        self.last_run_reaped = 0
+        self.last_run_at: Optional[float] = None
+        self.run_duration = LatencyHistogram(buckets=(0.1, 0.5, 1, 5, 10, 30, 60, 300))
+        self._task: Optional[asyncio.Task] = None
+
+    async def _try_lock(self, db) -> bool:
+        # Transaction-scoped: released by the commit at the end of each batch
+        if db.bind.dialect.name != "postgresql":
+            return True
+        return bool(await db.scalar(text("SELECT pg_try_advisory_xact_lock(:id)"), {"id": REAPER_LOCK_ID}))
+
+    async def run_once(self) -> int:
+        """Delete expired tokens in bounded batches until none are left or max_batches is hit."""
+        start = time.perf_counter()
+        reaped = 0
+        async with AsyncSessionLocal() as db:
+            for _ in range(self.max_batches):
+                if not await self._try_lock(db):
+                    logger.debug("Token reaper: another process is reaping, skipping")
+                    await db.rollback()
+                    break
+                deleted = await delete_expired_tokens_batch(db, self.batch_size)
+                reaped += deleted
+                if deleted < self.batch_size:
+                    break
+                # Pace the deletes so vacuum and replicas keep up
+                await asyncio.sleep(self.batch_pause)
+
+        elapsed = time.perf_counter() - start
+        self.runs += 1
+        self.total_reaped += reaped
+        self.last_run_reaped = reaped
+        self.last_run_at = time.time()
+        self.run_duration.observe(elapsed)
+        logger.info("Token reaper: deleted %d expired refresh tokens in %.2fs", reaped, elapsed)
+        return reaped
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Token reaper run failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="token-reaper")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "total_reaped": self.total_reaped,
+            "last_run_reaped": self.last_run_reaped,
+            "last_run_at": self.last_run_at,
+            "run_duration": self.run_duration.snapshot(),
+        }
+
+
+token_reaper = TokenReaper(
+    interval=settings.TOKEN_REAPER_INTERVAL_SECONDS,
+    batch_size=settings.TOKEN_REAPER_BATCH_SIZE,
+    batch_pause=settings.TOKEN_REAPER_BATCH_PAUSE_SECONDS,
+    max_batches=settings.TOKEN_REAPER_MAX_BATCHES,
+)
+
+
+async def _main(once: bool):
+    if once:
+        await token_reaper.run_once()
+        return
+    token_reaper.start()
+    await token_reaper._task
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Delete expired refresh tokens in batches")
+    parser.add_argument("--once", action="store_true", help="Run a single pass and exit")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+    asyncio.run(_main(args.once))
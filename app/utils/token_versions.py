@@ -0,0 +1,151 @@
+"""
+Instant revocation of access tokens.
+
+Every user has a token_version, bumped whenever all of their sessions must
+end: password change, revoke_all_tokens_for_user, account deletion. Access
+tokens carry the version they were issued under (the `tv` claim) and
+get_current_user rejects a token whose `tv` is older than the user's current
+version. Tokens issued before the claim existed count as version 0.
+
+Current versions live in process memory (TokenVersionMap), so checking a
+cached token costs no query. The worker that revokes updates its own map
+after the commit. On PostgreSQL the revoking transaction also sends
+`NOTIFY token_version, '<user_id>:<version>'`, and every worker LISTENs on a
+dedicated connection (TokenVersionListener), so other processes drop the
+user's cached tokens as soon as the commit lands. PUT /users/{id} sends
+the notification on every update, bumped or not, so a role or email change
+isn't served from stale snapshots either. Without PostgreSQL the
+other workers notice when their token cache entries expire
+(TOKEN_CACHE_TTL_SECONDS) and they reload the user.
+"""
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import make_url
+
+from app.core.config import settings
+from app.utils.token_cache import token_cache
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "token_version"
+
+
+def notify_statement(user_id: int, version: int):
+    """pg_notify() for the revoking transaction; delivered to listeners only if it commits."""
+    return select(func.pg_notify(CHANNEL, f"{user_id}:{version}"))
+
+
+async def publish(db, user_id: int, version: int):
+    # No commit: part of the caller's transaction
+    if db.get_bind().dialect.name == "postgresql":
+        await db.execute(notify_statement(user_id, version))
+
+
+class TokenVersionMap:
+    def __init__(self, max_size: int = 100_000):
+        self.max_size = max_size
+        self.rejected = 0
+        self.notifications = 0
+        self._versions: dict[int, int] = {}
+
+    def observe(self, user_id: int, version: int):
+        # Only ever moves forward: a lagging replica can't un-revoke anything
+        known = self._versions.pop(user_id, None)
+        self._versions[user_id] = version if known is None else max(known, version)
+        while len(self._versions) > self.max_size:
+            self._versions.pop(next(iter(self._versions)))
+
+    def revoke(self, user_id: int, version: int):
+        """The user's tokens older than `version` are no longer valid, in this process."""
+        self.observe(user_id, version)
+        token_cache.invalidate_user(user_id)
+
+    def is_revoked(self, user_id: int, token_version: int) -> bool:
+        known = self._versions.get(user_id)
+        if known is not None and token_version < known:
+            self.rejected += 1
+            return True
+        return False
+
+    def clear(self):
+        self._versions.clear()
+
+    def stats(self) -> dict:
+        return {"size": len(self._versions), "rejected": self.rejected, "notifications": self.notifications}
+
+
+token_versions = TokenVersionMap()
+
+
+class TokenVersionListener:
+    """LISTENs for token_version notifications on its own asyncpg connection, reconnecting on failure."""
+
+    def __init__(self, url: str, versions: TokenVersionMap, ping_interval: float = 30, reconnect_delay: float = 5):
+        self.dsn = make_url(url).set(drivername="postgresql").render_as_string(hide_password=False)
+        self.versions = versions
+        self.ping_interval = ping_interval
+        self.reconnect_delay = reconnect_delay
+        self.connected = False
+        self._task: Optional[asyncio.Task] = None
+
+    def _on_notify(self, connection, pid, channel, payload: str):
+        try:
+            user_id, version = (int(part) for part in payload.split(":"))
+        except ValueError:
+            logger.warning("Ignoring malformed %s notification %r", CHANNEL, payload)
+            return
+        self.versions.notifications += 1
+        self.versions.revoke(user_id, version)
+
+    async def _listen(self):
+        import asyncpg
+
+        connection = await asyncpg.connect(self.dsn)
+        try:
+            await connection.add_listener(CHANNEL, self._on_notify)
+            # Revocations sent while we were not listening are lost: re-check every token against the DB once
+            token_cache.clear()
+            self.connected = True
+            while True:
+                await asyncio.sleep(self.ping_interval)
+                await asyncio.wait_for(connection.execute("SELECT 1"), self.ping_interval)
+        finally:
+            self.connected = False
+            await connection.close(timeout=1)
+
+    async def _loop(self):
+        while True:
+            try:
+                await self._listen()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Token version listener disconnected, retrying in %ss",
+                               self.reconnect_delay, exc_info=True)
+            await asyncio.sleep(self.reconnect_delay)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop(), name="token-version-listener")
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def make_listener() -> Optional[TokenVersionListener]:
+    url = settings.TOKEN_VERSION_LISTEN_URL or settings.DATABASE_URL
+    if not url.startswith("postgresql"):
+        return None
+    return TokenVersionListener(url, token_versions)
+
+
+token_version_listener = make_listener()
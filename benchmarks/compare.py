@@ -0,0 +1,70 @@
+"""
+Compare two benchmark result files.
+
+    python -m benchmarks.compare benchmarks/results/old.json benchmarks/results/new.json --threshold 10
+
+Exits with status 1 when any p95 latency or throughput got worse by more
+than the threshold (percent), so it can gate CI. More failed requests also
+count as a regression: failures are usually fast, so that row's latency and
+throughput are not comparable and are not judged.
+"""
+import argparse
+import json
+import sys
+
+
+def _key(result: dict) -> tuple:
+    return result["endpoint"], result["mode"], result["concurrency"]
+
+
+def _change(old: float, new: float) -> float:
+    return (new - old) / old * 100 if old else 0.0
+
+
+def _error_rate(result: dict) -> float:
+    return result.get("errors", 0) / result["requests"] if result.get("requests") else 0.0
+
+
+def compare(old_report: dict, new_report: dict, threshold: float) -> list[str]:
+    old_results = {_key(r): r for r in old_report["results"]}
+    regressions = []
+    print(f"{'endpoint':<32} {'mode':<10} {'c':>4} {'p50 ms':>18} {'p95 ms':>18} {'p99 ms':>18} {'rps':>18} {'q/req':>11} {'errors':>11}")
+    for new in new_report["results"]:
+        old = old_results.get(_key(new))
+        if old is None:
+            continue
+        cells = []
+        for field in ("p50_ms", "p95_ms", "p99_ms", "throughput_rps"):
+            cells.append(f"{old[field]:>7.1f}→{new[field]:<7.1f}{_change(old[field], new[field]):+.0f}%")
+        queries = f"{old['db_queries_per_request']}→{new['db_queries_per_request']}"
+        errors = f"{old.get('errors', 0)}→{new.get('errors', 0)}"
+        print(f"{new['endpoint']:<32} {new['mode']:<10} {new['concurrency']:>4} " + " ".join(f"{c:>18}" for c in cells)
+              + f" {queries:>11} {errors:>11}")
+
+        if new.get("errors", 0) > old.get("errors", 0) or _error_rate(new) > _error_rate(old):
+            regressions.append(f"{_key(new)}: errors {old.get('errors', 0)} → {new.get('errors', 0)} "
+                               f"({_error_rate(old):.1%} → {_error_rate(new):.1%}), latency not comparable")
+            continue
+
+        if _change(old["p95_ms"], new["p95_ms"]) > threshold:
+            regressions.append(f"{_key(new)}: p95 {old['p95_ms']}ms → {new['p95_ms']}ms")
+        if -_change(old["throughput_rps"], new["throughput_rps"]) > threshold:
+            regressions.append(f"{_key(new)}: throughput {old['throughput_rps']} → {new['throughput_rps']} rps")
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("old")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args()
+
+    with open(args.old) as old_file, open(args.new) as new_file:
+        old_report, new_report = json.load(old_file), json.load(new_file)
+    print(f"{old_report['meta']['git_revision']} → {new_report['meta']['git_revision']}\n")
+
+    regressions = compare(old_report, new_report, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    sys.exit(1 if regressions else 0)
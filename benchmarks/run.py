@@ -0,0 +1,301 @@
+"""
+Latency/throughput benchmark for the auth and user endpoints.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.run --seed-users 10000 --concurrency 1,16,64
+    python -m benchmarks.run --mode uvicorn --concurrency 64
+
+Drives the ASGI app in-process (httpx.ASGITransport) and/or over a real
+uvicorn server, at each concurrency level, and writes p50/p95/p99 latency,
+throughput and DB queries per request to benchmarks/results/*.json.
+Compare two runs with `python -m benchmarks.compare old.json new.json`.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import re
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+
+from benchmarks.seed import BENCH_ADMIN, BENCH_PASSWORD, seed
+
+RESULTS_DIR = Path(__file__).parent / "results"
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+class QueryCounter:
+    """Counts statements on the app's async engine (in-process mode; uvicorn mode reads Server-Timing)."""
+
+    def __init__(self):
+        self.count = 0
+
+    def install(self):
+        from sqlalchemy import event
+        from app.core.database import async_engine
+
+        @event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+        def _count(*_):
+            self.count += 1
+
+
+def build_scenarios(ctx: dict) -> dict:
+    """endpoint name -> (request count multiplier, coroutine factory taking (client, i))"""
+    admin_headers = {"Authorization": f"Bearer {ctx['admin_access_token']}"}
+    refresh_tokens = ctx["refresh_tokens"]
+    users = ctx["users"]
+
+    async def login(client, i):
+        username = BENCH_ADMIN if i % 2 == 0 else f"bench_user_{i % users:08d}"
+        return await client.post("/auth/login", data={"username": username, "password": BENCH_PASSWORD})
+
+    async def refresh(client, i):
+        # Check a token out of the pool so no two in-flight requests share one
+        # (with REFRESH_TOKEN_ROTATION that would be a replay and revoke it)
+        token = refresh_tokens.pop()
+        try:
+            response = await client.post("/auth/refresh", json={"refresh_token": token})
+            if response.status_code == 200 and "refresh_token" in response.json():
+                token = response.json()["refresh_token"]
+            return response
+        finally:
+            refresh_tokens.insert(0, token)
+
+    async def me(client, i):
+        return await client.get("/users/me", headers=admin_headers)
+
+    async def list_users(client, i):
+        return await client.get("/users/", params={"limit": 100}, headers=admin_headers)
+
+    async def list_users_deep(client, i):
+        return await client.get("/users/", params={"limit": 100, "skip": max(users - 200, 0)}, headers=admin_headers)
+
+    async def search_users(client, i):
+        return await client.get("/users/", params={"search": f"{i % 1000:04d}", "limit": 20}, headers=admin_headers)
+
+    return {
+        # login is bcrypt-bound, so it gets a tenth of the requests
+        "POST /auth/login": (0.1, login),
+        "POST /auth/refresh": (1.0, refresh),
+        "GET /users/me": (1.0, me),
+        "GET /users/?limit=100": (1.0, list_users),
+        "GET /users/?limit=100&skip=deep": (0.5, list_users_deep),
+        "GET /users/?search": (0.5, search_users),
+    }
+
+
+async def drive(client: httpx.AsyncClient, make_request, concurrency: int, total: int) -> dict:
+    latencies: list[float] = []
+    errors = 0
+    next_index = 0
+    header_queries = None
+
+    async def worker():
+        nonlocal next_index, errors, header_queries
+        while next_index < total:
+            i = next_index
+            next_index += 1
+            start = time.perf_counter()
+            try:
+                response = await make_request(client, i)
+                if response.status_code >= 400:
+                    errors += 1
+                # Query count reported by the app's Server-Timing header (works over uvicorn too)
+                match = SERVER_TIMING_QUERIES.search(response.headers.get("server-timing", ""))
+                if match:
+                    header_queries = (header_queries or 0) + int(match.group(1))
+            except httpx.HTTPError:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies) * 1000, 3) if latencies else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "header_queries": header_queries,
+    }
+
+
+def prepare_context(users: int, refresh_token_count: int) -> dict:
+    from app.core.database import SessionLocal
+    from app.crud.token import issue_refresh_token
+    from app.utils.security import create_access_token
+
+    with SessionLocal() as db:
+        expires_at = datetime.utcnow() + timedelta(days=1)
+        refresh_tokens = [issue_refresh_token(db, 1, expires_at) for _ in range(refresh_token_count)]
+
+    return {
+        "users": users,
+        "refresh_tokens": refresh_tokens,
+        "admin_access_token": create_access_token({"sub": BENCH_ADMIN, "role": "admin"}),
+    }
+
+
+async def run_suite(client, scenarios, concurrency_levels, requests, mode, max_error_rate, counter=None) -> list[dict]:
+    results = []
+    for endpoint, (weight, make_request) in scenarios.items():
+        for concurrency in concurrency_levels:
+            total = max(int(requests * weight), concurrency)
+            # Short warm-up so connection set-up is not part of the measurement
+            await drive(client, make_request, concurrency, min(total, concurrency * 2))
+            queries_before = counter.count if counter else 0
+            result = await drive(client, make_request, concurrency, total)
+            if counter:
+                queries = (counter.count - queries_before) / total
+            else:
+                queries = result["header_queries"] / total if result["header_queries"] is not None else None
+            del result["header_queries"]
+            result.update(endpoint=endpoint, mode=mode, concurrency=concurrency,
+                          db_queries_per_request=round(queries, 2) if queries is not None else None)
+            # Mostly-failing requests are fast and would measure the error path, not the endpoint
+            result["failed"] = result["errors"] > total * max_error_rate
+            results.append(result)
+            print(f"[{mode}] {endpoint:<32} c={concurrency:<4} p50={result['p50_ms']:>9.2f}ms "
+                  f"p95={result['p95_ms']:>9.2f}ms p99={result['p99_ms']:>9.2f}ms "
+                  f"rps={result['throughput_rps']:>8.1f} q/req={result['db_queries_per_request']} "
+                  f"errors={result['errors']}{'  FAILED: too many errors' if result['failed'] else ''}")
+    return results
+
+
+async def run_in_process(scenarios, concurrency_levels, requests, max_error_rate) -> list[dict]:
+    from app.main import app
+
+    counter = QueryCounter()
+    counter.install()
+    async with app.router.lifespan_context(app):
+        from app.core.startup import readiness
+        while not readiness.ready:
+            await asyncio.sleep(0.1)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            return await run_suite(client, scenarios, concurrency_levels, requests, "in-process",
+                                   max_error_rate, counter)
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run_over_uvicorn(scenarios, concurrency_levels, requests, max_error_rate) -> list[dict]:
+    port = _free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=os.environ.copy(),
+    )
+    try:
+        limits = httpx.Limits(max_connections=max(concurrency_levels), max_keepalive_connections=max(concurrency_levels))
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+            for _ in range(300):
+                try:
+                    if (await client.get("/health/ready")).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                await asyncio.sleep(0.1)
+            else:
+                raise RuntimeError("uvicorn did not become ready")
+            return await run_suite(client, scenarios, concurrency_levels, requests, "uvicorn", max_error_rate)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+async def main():
+    concurrency_levels = [int(c) for c in args.concurrency.split(",")]
+
+    dataset = None
+    if not args.skip_seed:
+        dataset = seed(args.seed_users, args.seed_tokens)
+        print(f"Seeded {dataset}")
+
+    ctx = prepare_context(args.seed_users, refresh_token_count=200)
+    scenarios = build_scenarios(ctx)
+    if args.only:
+        scenarios = {name: s for name, s in scenarios.items() if any(part in name for part in args.only)}
+
+    results = []
+    if args.mode in ("in-process", "both"):
+        results += await run_in_process(scenarios, concurrency_levels, args.requests, args.max_error_rate)
+    if args.mode in ("uvicorn", "both"):
+        results += await run_over_uvicorn(scenarios, concurrency_levels, args.requests, args.max_error_rate)
+
+    from app.core.database import engine
+    report = {
+        "meta": {
+            "git_revision": git_revision(),
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "database": engine.dialect.name,
+            "fast_serialization": os.getenv("FAST_SERIALIZATION", "0"),
+            "login_rate_limit": os.environ["LOGIN_RATE_LIMIT_ENABLED"],
+            "dataset": {"users": args.seed_users, "refresh_tokens": args.seed_tokens, "seed": dataset},
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "requests": args.requests,
+            "concurrency": concurrency_levels,
+        },
+        "results": results,
+    }
+    RESULTS_DIR.mkdir(exist_ok=True)
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{report['meta']['git_revision']}-{int(time.time())}.json"
+    output.write_text(json.dumps(report, indent=2))
+    print(f"Results written to {output}")
+
+    failed = [f"{r['mode']} {r['endpoint']} c={r['concurrency']}" for r in results if r["failed"]]
+    if failed:
+        raise SystemExit(f"Error rate above {args.max_error_rate:.0%} in: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the auth and user endpoints")
+    parser.add_argument("--mode", choices=["in-process", "uvicorn", "both"], default="in-process")
+    parser.add_argument("--concurrency", default="1,16,64", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per endpoint and concurrency level")
+    parser.add_argument("--seed-users", type=int, default=10_000)
+    parser.add_argument("--seed-tokens", type=int, default=20_000)
+    parser.add_argument("--skip-seed", action="store_true", help="Reuse the data already in the database")
+    parser.add_argument("--only", action="append", help="Only run endpoints containing this text (repeatable)")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<rev>-<time>.json)")
+    parser.add_argument("--max-error-rate", type=float, default=0.01,
+                        help="Fail a scenario whose share of failed requests exceeds this")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+    # The login scenario replays a few seeded users: the limiter would answer most of it with 429.
+    # Set before the app is imported, and inherited by the uvicorn subprocess.
+    os.environ["LOGIN_RATE_LIMIT_ENABLED"] = "false"
+    # Query counts in uvicorn mode come from the Server-Timing header, which is off by default
+    os.environ["SERVER_TIMING_HEADER"] = "true"
+    asyncio.run(main())
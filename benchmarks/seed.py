@@ -0,0 +1,88 @@
+"""
+Seed a benchmark database with synthetic users and refresh tokens.
+
+    DATABASE_URL=postgresql://... python -m benchmarks.seed --users 1000000 --tokens 2000000
+
+All users share one precomputed bcrypt hash of BENCH_PASSWORD, so seeding
+a million rows does not take a million bcrypt rounds.
+"""
+import argparse
+import hashlib
+import os
+import random
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert
+
+BENCH_PASSWORD = "benchmark-password"
+BENCH_ADMIN = "bench_admin"
+BATCH_SIZE = 10_000
+
+
+def seed(users: int, tokens: int, expired_ratio: float = 0.3, reset: bool = True):
+    # Imported lazily so DATABASE_URL can be set by the caller first
+    from app.core import database
+    from app.models.token import RefreshToken
+    from app.models.user import User
+    from app.utils.security import hash_password
+
+    database.Base.metadata.create_all(bind=database.engine)
+    password_hash = hash_password(BENCH_PASSWORD)
+    rng = random.Random(42)
+    start = time.perf_counter()
+
+    with database.engine.begin() as conn:
+        if reset:
+            conn.execute(delete(RefreshToken))
+            conn.execute(delete(User))
+
+        conn.execute(insert(User), [{
+            "id": 1, "username": BENCH_ADMIN, "email": "bench_admin@example.com",
+            "password_hash": password_hash, "role": "admin",
+        }])
+        for offset in range(0, users, BATCH_SIZE):
+            conn.execute(insert(User), [
+                {
+                    "id": i + 2,
+                    "username": f"bench_user_{i:08d}",
+                    "email": f"bench_user_{i:08d}@example.com",
+                    "password_hash": password_hash,
+                    "role": "user",
+                }
+                for i in range(offset, min(offset + BATCH_SIZE, users))
+            ])
+
+        now = datetime.utcnow()
+        for offset in range(0, tokens, BATCH_SIZE):
+            rows = []
+            for i in range(offset, min(offset + BATCH_SIZE, tokens)):
+                expired = rng.random() < expired_ratio
+                rows.append({
+                    "user_id": rng.randint(1, users + 1),
+                    "token_hash": hashlib.sha256(f"seed-{i}".encode()).digest(),
+                    "expires_at": now + (timedelta(days=-1) if expired else timedelta(days=7)),
+                    "created_at": now,
+                })
+            conn.execute(insert(RefreshToken), rows)
+
+    if database.engine.dialect.name == "postgresql":
+        with database.engine.connect() as conn:
+            conn.exec_driver_sql("SELECT setval(pg_get_serial_sequence('users', 'id'), (SELECT max(id) FROM users))")
+            conn.exec_driver_sql("ANALYZE users")
+            conn.exec_driver_sql("ANALYZE refresh_tokens")
+            conn.commit()
+
+    return {"users": users + 1, "refresh_tokens": tokens, "seconds": round(time.perf_counter() - start, 2)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Seed a benchmark database")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--tokens", type=int, default=20_000)
+    parser.add_argument("--expired-ratio", type=float, default=0.3)
+    parser.add_argument("--keep", action="store_true", help="Do not wipe existing users/tokens first")
+    args = parser.parse_args()
+
+    os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+    print(seed(args.users, args.tokens, args.expired_ratio, reset=not args.keep))
@@ -0,0 +1,79 @@
+"""
+Per-item serialization cost of the list_users response (limit=100).
+
+    python -m benchmarks.serialization --items 100 --rounds 2000
+
+Compares FastAPI's default response_model path (validate ORM objects into
+UserResponse, jsonable_encoder, JSONResponse) with the FAST_SERIALIZATION
+path (column rows → precompiled TypeAdapter → JSON bytes). No database is
+needed: the inputs are built in memory, so only serialization is measured.
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import namedtuple
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench.db")
+
+from fastapi.responses import JSONResponse  # noqa: E402
+from fastapi.routing import serialize_response  # noqa: E402
+from fastapi.utils import create_model_field  # noqa: E402
+
+from app.models import token  # noqa: E402,F401  (registers RefreshToken for the User relationship)
+from app.models.user import User  # noqa: E402
+from app.schemas.user import UserResponse  # noqa: E402
+from app.utils.serialization import users_json  # noqa: E402
+
+Row = namedtuple("Row", ["id", "username", "email", "role"])
+
+
+async def default_path(field, users):
+    content = await serialize_response(field=field, response_content=users, is_coroutine=True)
+    return JSONResponse(content).body
+
+
+def fast_path(rows):
+    return users_json(rows).body
+
+
+async def measure(items: int, rounds: int) -> dict:
+    users = [User(id=i, username=f"bench_user_{i:08d}", email=f"bench_user_{i:08d}@example.com",
+                  password_hash="x", role="user") for i in range(items)]
+    rows = [Row(u.id, u.username, u.email, u.role) for u in users]
+    field = create_model_field(name="Response", type_=list[UserResponse], mode="serialization")
+
+    assert await default_path(field, users) == fast_path(rows), "both paths must produce the same JSON"
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await default_path(field, users)
+    default_seconds = (time.perf_counter() - start) / rounds
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fast_path(rows)
+    fast_seconds = (time.perf_counter() - start) / rounds
+
+    return {
+        "items": items,
+        "default_us_per_item": round(default_seconds / items * 1e6, 3),
+        "fast_us_per_item": round(fast_seconds / items * 1e6, 3),
+        "default_ms_per_response": round(default_seconds * 1000, 3),
+        "fast_ms_per_response": round(fast_seconds * 1000, 3),
+        "speedup": round(default_seconds / fast_seconds, 1),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Per-item cost of UserResponse serialization")
+    parser.add_argument("--items", type=int, default=100)
+    parser.add_argument("--rounds", type=int, default=2000)
+    args = parser.parse_args()
+
+    result = asyncio.run(measure(args.items, args.rounds))
+    print(f"default (response_model): {result['default_us_per_item']:>8.3f} µs/item "
+          f"({result['default_ms_per_response']} ms per {args.items}-item response)")
+    print(f"fast (TypeAdapter):       {result['fast_us_per_item']:>8.3f} µs/item "
+          f"({result['fast_ms_per_response']} ms per {args.items}-item response)")
+    print(f"speedup: {result['speedup']}x")
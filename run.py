@@ -0,0 +1,82 @@
+"""
+Production entry point.
+
+    python run.py                       # one worker per CPU core, settings from the environment/.env
+    python run.py --workers 4 --port 8080
+    python run.py --reload              # development: one process, restarts on code changes
+
+Uses uvloop and httptools when they are installed (the asyncio loop and the
+h11 parser otherwise). Each worker is a separate process with its own DB
+pool and password hashing pool: the hashing pool is split across workers
+unless PASSWORD_HASH_WORKERS is set.
+
+On SIGTERM/SIGINT the server stops accepting connections, waits up to
+SERVER_GRACEFUL_SHUTDOWN_SECONDS for in-flight requests, then runs the app's
+lifespan shutdown (background tasks, hashing pool, DB pool).
+"""
+import argparse
+import importlib.util
+import os
+
+import uvicorn
+
+from app.core.config import settings
+
+
+def available_cpus() -> int:
+    # Honours CPU affinity (taskset, container cpusets), unlike os.cpu_count()
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def _installed(module: str) -> bool:
+    return importlib.util.find_spec(module) is not None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the API server")
+    parser.add_argument("--host", default=settings.SERVER_HOST)
+    parser.add_argument("--port", type=int, default=settings.SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=settings.SERVER_WORKERS, help="0 = one per CPU core")
+    parser.add_argument("--reload", action="store_true", help="Development mode: single process, auto-reload")
+    args = parser.parse_args()
+
+    cpus = available_cpus()
+    workers = 1 if args.reload else (args.workers or cpus)
+    if "PASSWORD_HASH_WORKERS" not in os.environ:
+        # Inherited by the worker processes: N workers x cpus hashing processes would oversubscribe the cores
+        os.environ["PASSWORD_HASH_WORKERS"] = str(max(cpus // workers, 1))
+
+    loop = "uvloop" if _installed("uvloop") else "asyncio"
+    http = "httptools" if _installed("httptools") else "h11"
+    print(f"Starting {workers} worker(s) on {args.host}:{args.port} ({loop} loop, {http} parser, "
+          f"{os.environ['PASSWORD_HASH_WORKERS']} hashing process(es) per worker)")
+    if settings.DATABASE_URL.startswith("postgresql") and not settings.DB_PGBOUNCER_MODE:
+        # Every worker has its own pool: this is what max_connections has to accommodate
+        connections = workers * (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)
+        print(f"Up to {connections} PostgreSQL connections from {workers} pools")
+
+    uvicorn.run(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        workers=None if args.reload else workers,
+        reload=args.reload,
+        loop=loop,
+        http=http,
+        backlog=settings.SERVER_BACKLOG,
+        timeout_keep_alive=settings.SERVER_KEEP_ALIVE_SECONDS,
+        limit_concurrency=settings.SERVER_LIMIT_CONCURRENCY or None,
+        limit_max_requests=settings.SERVER_MAX_REQUESTS or None,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_SHUTDOWN_SECONDS,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.SERVER_FORWARDED_ALLOW_IPS,
+        access_log=settings.SERVER_ACCESS_LOG,
+        log_level=settings.LOG_LEVEL,
+    )
+
+
+if __name__ == "__main__":
+    main()
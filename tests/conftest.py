@@ -0,0 +1,46 @@
+import asyncio
+import os
+import tempfile
+
+# Settings are read at import time: point the app at a throwaway SQLite database first
+_db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_file.name}"
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "1")
+os.environ.setdefault("TOKEN_REAPER_ENABLED", "false")
+os.environ.setdefault("PASSWORD_BCRYPT_ROUNDS", "4")
+# Every test logs in from the same client address
+os.environ.setdefault("LOGIN_RATE_LIMIT_PER_IP", "100000")
+
+import httpx  # noqa: E402
+import pytest  # noqa: E402
+
+from app.core import database  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import token  # noqa: E402,F401
+
+database.Base.metadata.create_all(bind=database.engine)
+
+
+@pytest.fixture
+def run_client():
+    """Run `scenario(client)` against the app, inside its lifespan."""
+    def run(scenario):
+        async def main():
+            async with app.router.lifespan_context(app):
+                transport = httpx.ASGITransport(app=app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                    return await scenario(client)
+        return asyncio.run(main())
+    return run
+
+
+@pytest.fixture
+def login():
+    """`await login(client, username, role)` registers the user and returns its Authorization header."""
+    async def login(client, username: str, role: str = "user") -> dict:
+        await client.post("/auth/register", json={
+            "username": username, "email": f"{username}@example.com", "password": "password1", "role": role
+        })
+        response = await client.post("/auth/login", data={"username": username, "password": "password1"})
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return login
@@ -0,0 +1,50 @@
+import asyncio
+import json
+
+from app.utils.bulk_users import iter_records
+
+
+def _records(body: bytes, fmt: str, chunk_size: int = 7) -> list:
+    async def chunks():
+        for start in range(0, len(body), chunk_size):
+            yield body[start:start + chunk_size]
+
+    async def collect():
+        return [record async for record in iter_records(chunks(), fmt)]
+    return asyncio.run(collect())
+
+
+def test_csv_quoted_field_spanning_lines():
+    body = b'username,email,password\n"multi\nline",a@example.com,password1\n\nbob,"b@example.com",password1\n'
+    assert _records(body, "csv") == [
+        (2, {"username": "multi\nline", "email": "a@example.com", "password": "password1"}),
+        (5, {"username": "bob", "email": "b@example.com", "password": "password1"}),
+    ]
+
+
+def test_csv_unterminated_quote():
+    body = b'username,email,password\nalice,"a@example.com,password1\n'
+    assert _records(body, "csv") == [(2, "Unterminated quoted field")]
+
+
+def test_import_streams_ndjson_report(run_client):
+    body = (
+        b'username,email,password\n'
+        b'import_alice,import_alice@example.com,"pass\nword1"\n'
+        b'import_alice,import_alice@example.com,password1\n'
+        b'x,not-an-email,password1\n'
+    )
+
+    async def scenario(client):
+        await client.post("/auth/register", json={
+            "username": "import_admin", "email": "import_admin@example.com", "password": "password1", "role": "admin"
+        })
+        login = await client.post("/auth/login", data={"username": "import_admin", "password": "password1"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}", "Content-Type": "text/csv"}
+        response = await client.post("/users/import", content=body, headers=headers)
+        return response, [json.loads(line) for line in response.text.splitlines()]
+
+    response, lines = run_client(scenario)
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [line.get("status") for line in lines[:-1]] == ["created", "conflict", "invalid"]
+    assert lines[-1] == {"summary": {"created": 1, "conflict": 1, "invalid": 1}}
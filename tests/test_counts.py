@@ -0,0 +1,67 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.utils import counts
+
+
+@pytest.mark.parametrize("mode", ["exact", "estimate"])
+def test_count_modes_report_the_total(run_client, login, mode):
+    async def scenario(client):
+        admin = await login(client, f"count_admin_{mode}", role="admin")
+        for i in range(3):
+            await login(client, f"counted_{mode}_{i}")
+        response = await client.get(
+            "/users/", params={"search": f"counted_{mode}_", "search_mode": "prefix", "limit": 2, "count": mode},
+            headers=admin,
+        )
+        return response.status_code, len(response.json()), response.headers
+
+    status, rows, headers = run_client(scenario)
+    assert (status, rows) == (200, 2)
+    assert headers["X-Total-Count"] == "3"
+    # Estimates are PostgreSQL-only: elsewhere the exact count is used, and the header says so
+    assert headers["X-Total-Count-Mode"] == "exact"
+
+
+def test_exact_count_is_cached_per_filter(run_client, login):
+    async def scenario(client):
+        admin = await login(client, "count_cache_admin", role="admin")
+        params = {"search": "cached_count_", "search_mode": "prefix", "count": "exact"}
+        await login(client, "cached_count_1")
+        first = await client.get("/users/", params=params, headers=admin)
+        await login(client, "cached_count_2")
+        second = await client.get("/users/", params=params, headers=admin)
+        other_filter = await client.get("/users/", params={**params, "role": "user"}, headers=admin)
+        return [r.headers["X-Total-Count"] for r in (first, second, other_filter)]
+
+    # Within COUNT_CACHE_TTL_SECONDS the same filters get the cached total
+    assert run_client(scenario) == ["1", "1", "2"]
+
+
+def test_unknown_count_mode_is_a_400(run_client, login):
+    async def scenario(client):
+        admin = await login(client, "count_bad_admin", role="admin")
+        return (await client.get("/users/", params={"count": "approximate"}, headers=admin)).status_code
+
+    assert run_client(scenario) == 400
+
+
+@pytest.mark.parametrize("estimate, expected", [
+    (None, (42, "exact")),                                                 # never analyzed
+    (settings.COUNT_ESTIMATE_EXACT_BELOW - 1, (42, "exact")),              # small: counted exactly
+    (settings.COUNT_ESTIMATE_EXACT_BELOW, (settings.COUNT_ESTIMATE_EXACT_BELOW, "estimate")),
+])
+def test_estimate_mode_on_postgresql(monkeypatch, estimate, expected):
+    async def planner_estimate(db, query):
+        return estimate
+
+    async def exact_count(db, query):
+        return 42
+
+    monkeypatch.setattr(counts, "planner_estimate", planner_estimate)
+    monkeypatch.setattr(counts, "exact_count", exact_count)
+    db = SimpleNamespace(get_bind=lambda: SimpleNamespace(dialect=SimpleNamespace(name="postgresql")))
+    assert asyncio.run(counts.count_total(db, None, "estimate")) == expected
@@ -0,0 +1,42 @@
+def test_if_none_match_returns_304(run_client, login):
+    async def scenario(client):
+        headers = await login(client, "etag_reader")
+        me = await client.get("/users/me", headers=headers)
+        etag = me.headers["ETag"]
+        by_id = await client.get(f"/users/{me.json()['id']}", headers=headers)
+        me_again = await client.get("/users/me", headers={**headers, "If-None-Match": etag})
+        weak = await client.get(f"/users/{me.json()['id']}", headers={**headers, "If-None-Match": f"W/{etag}"})
+        return etag, by_id.headers["ETag"], me_again, weak
+
+    etag, by_id_etag, me_again, weak = run_client(scenario)
+    assert by_id_etag == etag
+    assert (me_again.status_code, me_again.content, me_again.headers["ETag"]) == (304, b"", etag)
+    assert weak.status_code == 304
+
+
+def test_etag_changes_after_put(run_client, login):
+    async def scenario(client):
+        headers = await login(client, "etag_writer")
+        me = await client.get("/users/me", headers=headers)
+        etag = me.headers["ETag"]
+        put = await client.put(f"/users/{me.json()['id']}", json={"email": "etag_writer2@example.com"}, headers=headers)
+        stale = await client.get(f"/users/{me.json()['id']}", headers={**headers, "If-None-Match": etag})
+        stale_me = await client.get("/users/me", headers={**headers, "If-None-Match": etag})
+        return etag, put.headers["ETag"], stale, stale_me
+
+    etag, put_etag, stale, stale_me = run_client(scenario)
+    assert put_etag != etag
+    assert (stale.status_code, stale.headers["ETag"]) == (200, put_etag)
+    assert stale.json()["email"] == "etag_writer2@example.com"
+    assert (stale_me.status_code, stale_me.headers["ETag"]) == (200, put_etag)
+
+
+def test_list_page_etag(run_client, login):
+    async def scenario(client):
+        headers = await login(client, "etag_admin", role="admin")
+        page = await client.get("/users/", params={"limit": 5}, headers=headers)
+        again = await client.get("/users/", params={"limit": 5}, headers={**headers, "If-None-Match": page.headers["ETag"]})
+        other = await client.get("/users/", params={"limit": 4}, headers={**headers, "If-None-Match": page.headers["ETag"]})
+        return page.status_code, again.status_code, other.status_code
+
+    assert run_client(scenario) == (200, 304, 200)
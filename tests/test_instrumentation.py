@@ -0,0 +1,5 @@
+def test_no_server_timing_header_by_default(run_client):
+    async def scenario(client):
+        return (await client.get("/")).headers
+
+    assert "server-timing" not in run_client(scenario)
@@ -0,0 +1,5 @@
+def test_internal_endpoints_not_mounted_by_default(run_client):
+    async def scenario(client):
+        return [(await client.get(path)).status_code for path in ("/internal/metrics", "/internal/stats/db-pool")]
+
+    assert run_client(scenario) == [404, 404]
@@ -0,0 +1,49 @@
+import base64
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from app.utils.pagination import decode_cursor, encode_cursor
+
+
+def _cursor(**payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def test_round_trip():
+    assert decode_cursor(encode_cursor("username", "asc", "alice", 7), "username", "asc") == ("alice", 7)
+    assert decode_cursor(encode_cursor("id", "desc", 7, 7), "id", "desc") == (7, 7)
+
+
+@pytest.mark.parametrize("cursor, sort_by", [
+    (_cursor(s="id", o="asc", v="7", id=7), "id"),
+    (_cursor(s="id", o="asc", v={"a": 1}, id=7), "id"),
+    (_cursor(s="id", o="asc", v=True, id=7), "id"),
+    (_cursor(s="id", o="asc", v=2**40, id=7), "id"),
+    (_cursor(s="username", o="asc", v=["x"], id=7), "username"),
+    (_cursor(s="username", o="asc", v=5, id=7), "username"),
+    (_cursor(s="username", o="asc", v="alice", id="7"), "username"),
+    (_cursor(s="username", o="asc", v="alice", id=None), "username"),
+    (_cursor(s="username", o="asc", v="alice", id=2**31), "username"),
+    ("not base64!", "id"),
+])
+def test_tampered_cursor_is_a_400(cursor, sort_by):
+    with pytest.raises(HTTPException) as exc:
+        decode_cursor(cursor, sort_by, "asc")
+    assert exc.value.status_code == 400
+
+
+def test_list_users_rejects_tampered_cursor(run_client):
+    async def scenario(client):
+        await client.post("/auth/register", json={
+            "username": "cursor_admin", "email": "cursor_admin@example.com", "password": "password1", "role": "admin"
+        })
+        login = await client.post("/auth/login", data={"username": "cursor_admin", "password": "password1"})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        response = await client.get(
+            "/users/", params={"cursor": _cursor(s="id", o="asc", v={"x": 1}, id=1)}, headers=headers
+        )
+        return response.status_code, response.json()
+
+    assert run_client(scenario) == (400, {"detail": "Invalid cursor"})
@@ -0,0 +1,47 @@
+import asyncio
+
+from app.core.config import settings
+from app.utils.rate_limit import MemoryBackend, SlidingWindowLimiter
+
+
+async def _attempt(client, username: str, password: str = "wrong-password"):
+    return await client.post("/auth/login", data={"username": username, "password": password})
+
+
+def test_sliding_window_blocks_beyond_the_limit():
+    async def scenario():
+        limiter = SlidingWindowLimiter(MemoryBackend(), "test", limit=2, window=60)
+        return [await limiter.hit("key") for _ in range(3)]
+
+    first, second, third = asyncio.run(scenario())
+    assert first == second == 0
+    assert 0 < third <= 60
+
+
+def test_login_limit_returns_429_with_retry_after(run_client, login):
+    limit = settings.LOGIN_RATE_LIMIT_PER_USERNAME
+
+    async def scenario(client):
+        await login(client, "limited_user")  # the successful login starts from a clean counter
+        statuses = [(await _attempt(client, "limited_user")).status_code for _ in range(limit)]
+        blocked = await _attempt(client, "limited_user", "password1")
+        return statuses, blocked
+
+    statuses, blocked = run_client(scenario)
+    assert statuses == [401] * limit
+    # Even the right password is turned away until the window has moved on
+    assert blocked.status_code == 429
+    assert 0 < int(blocked.headers["Retry-After"]) <= settings.LOGIN_RATE_LIMIT_WINDOW_SECONDS
+
+
+def test_successful_login_resets_the_username_counter(run_client, login):
+    limit = settings.LOGIN_RATE_LIMIT_PER_USERNAME
+
+    async def scenario(client):
+        await login(client, "reset_user")
+        before = [(await _attempt(client, "reset_user")).status_code for _ in range(limit - 1)]
+        success = await _attempt(client, "reset_user", "password1")
+        after = [(await _attempt(client, "reset_user")).status_code for _ in range(limit)]
+        return before, success.status_code, after
+
+    assert run_client(scenario) == ([401] * (limit - 1), 200, [401] * limit)
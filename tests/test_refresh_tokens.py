@@ -0,0 +1,97 @@
+import pytest
+
+from app.core.config import settings
+from app.crud.token import parse_refresh_token
+
+TAMPERED_TOKENS = [
+    "99999999999999999999.secret",  # beyond INTEGER
+    "2147483648.secret",            # 2**31
+    "١٢.secret",                    # Unicode digits
+    "-1.secret",
+    ".secret",
+    "12.",
+]
+
+
+@pytest.mark.parametrize("token", TAMPERED_TOKENS)
+def test_parse_rejects_ids_that_cannot_be_primary_keys(token):
+    assert parse_refresh_token(token) is None
+
+
+def test_parse_accepts_issued_format():
+    assert parse_refresh_token("2147483647.abc") == (2147483647, "abc")
+
+
+@pytest.mark.parametrize("token", TAMPERED_TOKENS)
+def test_tampered_token_is_rejected_not_a_server_error(run_client, token):
+    async def scenario(client):
+        refresh = await client.post("/auth/refresh", json={"refresh_token": token})
+        logout = await client.post("/auth/logout", json={"refresh_token": token})
+        return refresh.status_code, logout.status_code
+
+    assert run_client(scenario) == (401, 404)
+
+
+@pytest.mark.parametrize("token", TAMPERED_TOKENS)
+def test_malformed_token_on_rotation_path(run_client, monkeypatch, token):
+    monkeypatch.setattr(settings, "REFRESH_TOKEN_ROTATION", True)
+
+    async def scenario(client):
+        response = await client.post("/auth/refresh", json={"refresh_token": token})
+        return response.status_code, response.json()
+
+    assert run_client(scenario) == (401, {"detail": "Invalid refresh token"})
+
+
+def test_replay_after_two_rotations_revokes_the_family(run_client, monkeypatch):
+    monkeypatch.setattr(settings, "REFRESH_TOKEN_ROTATION", True)
+
+    async def scenario(client):
+        await client.post("/auth/register", json={
+            "username": "replay_victim", "email": "replay_victim@example.com", "password": "password1"
+        })
+        login = await client.post("/auth/login", data={"username": "replay_victim", "password": "password1"})
+        stolen = login.json()["refresh_token"]
+        # The thief rotates A -> B -> C before the owner uses A again
+        b = (await client.post("/auth/refresh", json={"refresh_token": stolen})).json()["refresh_token"]
+        c = (await client.post("/auth/refresh", json={"refresh_token": b})).json()["refresh_token"]
+        replay = await client.post("/auth/refresh", json={"refresh_token": stolen})
+        thief = await client.post("/auth/refresh", json={"refresh_token": c})
+        return replay.status_code, thief.status_code
+
+    assert run_client(scenario) == (401, 401)
+
+
+def test_guessed_secret_does_not_revoke_the_family(run_client, monkeypatch):
+    monkeypatch.setattr(settings, "REFRESH_TOKEN_ROTATION", True)
+
+    async def scenario(client):
+        await client.post("/auth/register", json={
+            "username": "guess_target", "email": "guess_target@example.com", "password": "password1"
+        })
+        login = await client.post("/auth/login", data={"username": "guess_target", "password": "password1"})
+        token = login.json()["refresh_token"]
+        guess = await client.post("/auth/refresh", json={"refresh_token": token.split(".")[0] + ".guessed"})
+        owner = await client.post("/auth/refresh", json={"refresh_token": token})
+        return guess.status_code, owner.status_code
+
+    assert run_client(scenario) == (401, 200)
+
+
+def test_replaying_a_rotated_token_revokes_the_session(run_client, monkeypatch):
+    monkeypatch.setattr(settings, "REFRESH_TOKEN_ROTATION", True)
+
+    async def scenario(client):
+        await client.post("/auth/register", json={
+            "username": "rotating_user", "email": "rotating_user@example.com", "password": "password1"
+        })
+        login = await client.post("/auth/login", data={"username": "rotating_user", "password": "password1"})
+        old = login.json()["refresh_token"]
+        rotated = await client.post("/auth/refresh", json={"refresh_token": old})
+        new = rotated.json()["refresh_token"]
+        replay = await client.post("/auth/refresh", json={"refresh_token": old})
+        after = await client.post("/auth/refresh", json={"refresh_token": new})
+        return rotated.status_code, new != old, replay.status_code, after.status_code
+
+    # The replay kills the family: the current token stops working too
+    assert run_client(scenario) == (200, True, 401, 401)
@@ -0,0 +1,44 @@
+from app.crud import async_user
+from app.utils.token_cache import token_cache
+from app.utils.token_versions import token_versions
+
+
+def test_role_change_is_published_to_other_workers(run_client, login, monkeypatch):
+    published = []
+
+    async def publish(db, user_id, version):
+        published.append((user_id, version))
+
+    monkeypatch.setattr(async_user, "publish_token_version", publish)
+
+    async def scenario(client):
+        admin = await login(client, "tv_admin", role="admin")
+        demoted = await login(client, "tv_demoted", role="admin")
+        me = (await client.get("/users/me", headers=demoted)).json()
+        response = await client.put(f"/users/{me['id']}", json={"role": "user"}, headers=admin)
+        forbidden = await client.get("/users/", headers=demoted)
+        return me["id"], response.status_code, forbidden.status_code
+
+    user_id, updated, forbidden = run_client(scenario)
+    assert (updated, forbidden) == (200, 403)
+    # Same token version: other workers drop the cached snapshot, the sessions stay valid
+    assert published == [(user_id, 0)]
+
+
+def test_access_token_rejected_after_token_version_bump(run_client, login):
+    async def scenario(client):
+        headers = await login(client, "tv_changer")
+        cached = await client.get("/users/me", headers=headers)  # now in the token cache
+        changed = await client.post("/users/change-password", headers=headers, json={
+            "old_password": "password1", "new_password": "password2"
+        })
+        same_worker = await client.get("/users/me", headers=headers)
+        # Another worker: nothing cached or recorded, the claim is checked against the database
+        token_cache.clear()
+        token_versions.clear()
+        other_worker = await client.get("/users/me", headers=headers)
+        relogin = await client.post("/auth/login", data={"username": "tv_changer", "password": "password2"})
+        fresh = await client.get("/users/me", headers={"Authorization": f"Bearer {relogin.json()['access_token']}"})
+        return [r.status_code for r in (cached, changed, same_worker, other_worker, fresh)]
+
+    assert run_client(scenario) == [200, 200, 401, 401, 200]